@@ -0,0 +1,219 @@
+"""
+This module solves many frozen pond puzzles at once. The
+puzzles are spread over a pool of worker processes, and each
+result is handed back as soon as its puzzle is finished,
+together with how long it took or why it failed.
+
+It is run through escape.py, for example
+
+    python escape.py ponds/ extra/*.txt --workers 8 --json
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import escape
+import instrument
+import results
+
+def findPuzzles( paths ):
+    """
+    This function expands files, directories and glob
+    patterns into a list of puzzle files. Directories
+    contribute every file directly inside them.
+    :param paths: the paths given on the command line
+    :return: A list of file names, without repeats
+    """
+    fileNames = []
+    for path in paths:
+        if os.path.isdir( path ):
+            matches = [ os.path.join( path, name ) for name in sorted( os.listdir( path ) ) ]
+            matches = [ name for name in matches if os.path.isfile( name ) ]
+        elif glob.has_magic( path ):
+            matches = sorted( glob.glob( path ) )
+        else:
+            matches = [ path ]
+        for name in matches:
+            if name not in fileNames:
+                fileNames.append( name )
+    return fileNames
+
+# The number of puzzles handed to the pool at a time per worker
+WINDOW_PER_WORKER = 2
+
+# The result cache of this process, opened on first use
+caches = {}
+
+def solvePuzzle( fileName, mode='reverse', compact=False, cacheDirectory=None,
+                 report=False, profileDirectory=None ):
+    """
+    This function solves one puzzle in a worker process.
+    Any error is caught and reported in the result, so that
+    one bad file does not stop the batch.
+    :param fileName: the puzzle file
+    :param mode: the mode handed to escape.testingResults
+    :param compact: the compact flag handed to escape.testingResults
+    :param cacheDirectory: where the result cache is kept, or
+                           None to solve without the cache
+    :param report: whether to instrument the solve
+    :param profileDirectory: where to dump cProfile statistics
+                             of the solve, or None
+    :return: A dictionary with the file name, the seconds taken,
+             and either the results.Results or the error. With the cache,
+             it also says where the answer came from, and with
+             report, what the instrumentation recorded.
+    """
+    start = time.perf_counter()
+    result = { 'file': fileName }
+    if report:
+        instrument.enable()
+    try:
+        if profileDirectory != None:
+            instrument.profiled( profileDirectory, fileName, solveInto,
+                                 result, fileName, mode, compact, cacheDirectory )
+        else:
+            solveInto( result, fileName, mode, compact, cacheDirectory )
+    except Exception as error:
+        result['error'] = type( error ).__name__ + ": " + str( error )
+    result['seconds'] = time.perf_counter() - start
+    if report:
+        result['report'] = instrument.snapshot()
+        instrument.disable()
+    return result
+
+def solveInto( result, fileName, mode, compact, cacheDirectory ):
+    """
+    This function is the solve of solvePuzzle.
+    :param result: the dictionary to put the results into
+    :param fileName: the puzzle file
+    :param mode: the mode handed to escape.testingResults
+    :param compact: the compact flag handed to escape.testingResults
+    :param cacheDirectory: where the result cache is kept, or None
+    :return: None
+    """
+    compact = escape.compactMode( fileName, mode, compact )
+    if cacheDirectory != None and mode != 'reference':
+        import cache
+        import pond
+        if cacheDirectory not in caches:
+            caches[cacheDirectory] = cache.ResultCache( cacheDirectory )
+        with instrument.phase( 'readTest' ):
+            puzzle = pond.readCompact( fileName )
+        with instrument.phase( 'solve' ):
+            dist, result['cache'] = caches[cacheDirectory].solve(
+                puzzle, escape.modeSolver( fileName, mode, compact ) )
+            result['results'] = results.Results( puzzle, dist )
+    else:
+        result['results'] = escape.testingResults( fileName, mode, compact )
+
+def runBatch( fileNames, workers=None, mode='reverse', compact=False,
+              cacheDirectory=None, report=False, profileDirectory=None ):
+    """
+    This generator solves the puzzles on a pool of worker
+    processes and yields each result as soon as it is ready,
+    so results come back in the order the puzzles finish.
+    :param fileNames: the puzzle files
+    :param workers: the number of processes, or None for one
+                    per processor; always one in the parallel mode
+    :param mode: the mode handed to escape.testingResults
+    :param compact: the compact flag handed to escape.testingResults
+    :param cacheDirectory: where the result cache is kept, or None
+    :param report: whether to instrument each solve
+    :param profileDirectory: where to dump cProfile statistics, or None
+    :return: A generator of the results of solvePuzzle
+    """
+    # The parallel mode already runs a process per processor for
+    # each pond, so the ponds are solved one at a time rather
+    # than starting that many processes for every batch worker
+    if mode == 'parallel':
+        workers = 1
+
+    window = WINDOW_PER_WORKER * ( workers or os.cpu_count() or 1 )
+    remaining = iter( fileNames )
+    with ProcessPoolExecutor( max_workers=workers ) as pool:
+
+        # Only a window of puzzles is in flight, and each future
+        # is dropped once its result is handed out, so memory
+        # does not grow with the batch
+        pending = set()
+        while True:
+            for fileName in remaining:
+                pending.add( pool.submit( solvePuzzle, fileName, mode, compact,
+                                          cacheDirectory, report, profileDirectory ) )
+                if len( pending ) >= window:
+                    break
+            if len( pending ) == 0:
+                return
+            done, pending = wait( pending, return_when=FIRST_COMPLETED )
+            while done:
+                yield done.pop().result()
+
+def printResult( result, asJson=False, outputFormat='text' ):
+    """
+    This function prints one result of the batch, either with
+    one of the writers of the results module, or as one line
+    of JSON with the positions grouped as in testingSpots.
+    :param result: a result of solvePuzzle
+    :param asJson: whether to print a line of JSON
+    :param outputFormat: the name of a writer in results.WRITERS
+    :return: None
+    """
+    if asJson:
+        line = dict( result )
+        line.pop( 'report', None )
+        if 'results' in line:
+            line['steps'] = { str(moves): spots
+                              for moves, spots in line.pop( 'results' ).steps().items() }
+        print( json.dumps( line ), flush=True )
+    elif 'error' in result:
+        print( "\n" + result['file'] + " failed after %.3f s: " % result['seconds'] +
+               result['error'], flush=True )
+    else:
+        cached = " cached" if result.get( 'cache', 'miss' ) != 'miss' else ""
+        print( "\n" + result['file'] + " (%.3f s%s): " % ( result['seconds'], cached ) )
+        results.WRITERS[outputFormat]( result['results'], sys.stdout )
+        sys.stdout.flush()
+
+def streamPuzzle( fileName, outputFormat='text' ):
+    """
+    This function solves one puzzle in this process and prints
+    each layer of moves as soon as it is found, with one of the
+    streaming writers of the results module.
+    :param fileName: the puzzle file
+    :param outputFormat: the name of a writer in results.STREAMERS
+    :return: None if the puzzle was solved, or else the error
+    """
+    import pond
+    print( "\n" + fileName + ": ", flush=True )
+    try:
+        puzzle = pond.readCompact( fileName )
+        results.STREAMERS[outputFormat]( puzzle, escape.solveLayers( puzzle ), sys.stdout )
+    except Exception as error:
+        print( fileName + " failed: " + type( error ).__name__ + ": " + str( error ), flush=True )
+        return error
+    return None
+
+def printReport( fileName, recorded, output, asJson=False ):
+    """
+    This function prints the instrumentation report of one
+    puzzle to standard error.
+    :param fileName: the puzzle file
+    :param recorded: the snapshot recorded while solving it
+    :param output: the seconds taken to print its result
+    :param asJson: whether to print the report as JSON
+    :return: None
+    """
+    recorded = { 'timers': dict( recorded['timers'] ), 'counters': recorded['counters'] }
+    recorded['timers']['output'] = output
+    if asJson:
+        recorded['file'] = fileName
+        print( instrument.report( recorded, True ), file=sys.stderr, flush=True )
+    else:
+        print( "Report for " + fileName + ":\n" + instrument.report( recorded ),
+               file=sys.stderr, flush=True )
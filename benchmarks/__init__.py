@@ -0,0 +1,6 @@
+"""
+Benchmarks for the frozen pond puzzle solver. Each module
+can be run from the top of the repository, for example
+
+    python -m benchmarks.queues
+"""
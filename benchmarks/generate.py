@@ -0,0 +1,125 @@
+"""
+This module generates frozen pond puzzles of any size for
+the benchmarks. Generation is seeded, so the same arguments
+always give the same pond.
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import random
+
+# The kinds of pond generatePond can make
+KINDS = ( 'random', 'open', 'maze', 'walled' )
+
+def generatePond( height, width, density=0.3, seed=0, escape=None, kind='random' ):
+    """
+    This function generates a pond, always with the position
+    next to the exit open. A random pond has rocks scattered
+    with the given density, an open pond has none, a maze is
+    carved out of solid rock, and a walled pond has rings of
+    rock with gaps, like test2, with rocks scattered between.
+    :param height: the height of the pond
+    :param width: the width of the pond
+    :param density: the chance that a position is a rock
+    :param seed: the seed of the random number generator
+    :param escape: the escape row, or None for a random row
+    :param kind: one of KINDS
+    :return: The height, width and escape row of the pond,
+             and its rows as strings of '.' and '*'
+    """
+    if kind not in KINDS:
+        raise ValueError( "unknown kind of pond: " + str( kind ) )
+    rng = random.Random( seed )
+    if escape == None:
+        escape = rng.randrange( height )
+
+    if kind == 'maze':
+        grid = carveMaze( height, width, rng )
+    else:
+        if kind == 'open':
+            density = 0
+        grid = [ [ '*' if rng.random() < density else '.'
+                   for column in range( width ) ]
+                 for row in range( height ) ]
+        if kind == 'walled':
+            buildWalls( grid, height, width, rng )
+    rows = [ ''.join( row ) for row in grid ]
+
+    # Keep the way out open, so the pond is worth solving
+    if width > 0:
+        rows[escape] = rows[escape][:-1] + '.'
+    return height, width, escape, rows
+
+def carveMaze( height, width, rng ):
+    """
+    This function carves a maze out of solid rock with a
+    depth first search over the positions at even rows and
+    columns, knocking out the rock between two of them.
+    :param height: the height of the pond
+    :param width: the width of the pond
+    :param rng: the random number generator
+    :return: The pond as a list of lists of '.' and '*'
+    """
+    grid = [ [ '*' ] * width for row in range( height ) ]
+    if height == 0 or width == 0:
+        return grid
+    grid[0][0] = '.'
+    stack = [ ( 0, 0 ) ]
+    while len( stack ) > 0:
+        row, column = stack[-1]
+        choices = [ ( row + dr, column + dc, row + dr // 2, column + dc // 2 )
+                    for dr, dc in ( ( -2, 0 ), ( 2, 0 ), ( 0, -2 ), ( 0, 2 ) )
+                    if 0 <= row + dr < height and 0 <= column + dc < width
+                    and grid[row + dr][column + dc] == '*' ]
+        if len( choices ) == 0:
+            stack.pop()
+            continue
+        nextRow, nextColumn, wallRow, wallColumn = rng.choice( choices )
+        grid[wallRow][wallColumn] = '.'
+        grid[nextRow][nextColumn] = '.'
+        stack.append( ( nextRow, nextColumn ) )
+    return grid
+
+def buildWalls( grid, height, width, rng ):
+    """
+    This function lays rings of rock, two positions apart,
+    around the middle of the pond, with one gap in each side.
+    :param grid: the pond as a list of lists, changed in place
+    :param height: the height of the pond
+    :param width: the width of the pond
+    :param rng: the random number generator
+    :return: None
+    """
+    ring = 1
+    while 2 * ring < height - 1 and 2 * ring < width - 1:
+        top, bottom = ring, height - 1 - ring
+        left, right = ring, width - 1 - ring
+        for column in range( left, right + 1 ):
+            grid[top][column] = '*'
+            grid[bottom][column] = '*'
+        for row in range( top, bottom + 1 ):
+            grid[row][left] = '*'
+            grid[row][right] = '*'
+        if right - left > 1:
+            grid[top][rng.randrange( left + 1, right )] = '.'
+            grid[bottom][rng.randrange( left + 1, right )] = '.'
+        if bottom - top > 1:
+            grid[rng.randrange( top + 1, bottom )][left] = '.'
+            grid[rng.randrange( top + 1, bottom )][right] = '.'
+        ring += 2
+
+def writePond( fileName, height, width, escape, rows ):
+    """
+    This function writes a pond in the format read by
+    escape.readTest.
+    :param fileName: the name of the file to write
+    :param height: the height of the pond
+    :param width: the width of the pond
+    :param escape: the escape row
+    :param rows: the rows of the pond as strings
+    :return: None
+    """
+    with open( fileName, 'w' ) as file:
+        file.write( str(height) + " " + str(width) + " " + str(escape) + "\n" )
+        for row in rows:
+            file.write( row + "\n" )
@@ -0,0 +1,104 @@
+"""
+This module measures how parallel.solveParallel speeds up with
+the number of worker processes, on generated ponds, against
+the single process escape.solveCompact.
+
+    python -m benchmarks.parallel --sizes 500 1000 --workers 1 2 4 8
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import argparse
+import json
+import os
+import time
+
+import escape
+import parallel
+import pond
+from benchmarks.generate import generatePond
+
+def makePuzzle( size, density, seed, kind ):
+    """
+    This function generates a square pond as a compact puzzle.
+    Many random ponds have an exit that only a few positions
+    can reach, which leaves nothing to share out, so seeds are
+    tried in turn until half the open positions have a path.
+    :param size: the height and width of the pond
+    :param density: the rock density
+    :param seed: the first seed to try
+    :param kind: the kind of pond, see generate.KINDS
+    :return: A pond.CompactPuzzle
+    """
+    for attempt in range( seed, seed + 50 ):
+        height, width, escapeRow, rows = generatePond( size, size, density, attempt, kind=kind )
+        puzzle = pond.fromText( rows, width, height, escapeRow )
+        reached = sum( 1 for moves in escape.solveCompact( puzzle ).dist if moves > 0 )
+        if 2 * reached >= len( puzzle.rocks ) - sum( puzzle.rocks ):
+            break
+    return puzzle
+
+def timeSolve( solve, *arguments ):
+    """
+    This function times a solve.
+    :param solve: the function to call
+    :param arguments: its arguments
+    :return: The seconds taken
+    """
+    start = time.perf_counter()
+    solve( *arguments )
+    return time.perf_counter() - start
+
+def speedups( sizes, workers, density=0.2, seed=0, kind='random' ):
+    """
+    This generator times every pond with every number of workers.
+    :param sizes: the side lengths of the ponds
+    :param workers: the numbers of worker processes
+    :param density: the rock density
+    :param seed: the seed of the ponds
+    :param kind: the kind of pond, see generate.KINDS
+    :return: A generator of one dictionary per pond, with the
+             seconds of the serial solve and of every parallel one
+    """
+    for size in sizes:
+        puzzle = makePuzzle( size, density, seed, kind )
+        result = { 'size': size, 'kind': kind, 'density': density,
+                   'serial': timeSolve( escape.solveCompact, puzzle ), 'parallel': {} }
+        for count in workers:
+            result['parallel'][count] = timeSolve( parallel.solveParallel, puzzle, count )
+        yield result
+
+def main( arguments=None ):
+    """
+    This function prints the speedup curve of every pond, and
+    optionally writes the timings as JSON.
+    :param arguments: the command line arguments, or None for sys.argv
+    :return: None
+    """
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser( description="Time the parallel solve." )
+    parser.add_argument( '--sizes', type=int, nargs='+', default=[ 300, 600 ] )
+    parser.add_argument( '--workers', type=int, nargs='+',
+                         default=sorted( set( [ 1, 2, 4, 8, cores ] ) & set( range( 1, cores + 1 ) ) ) )
+    parser.add_argument( '--density', type=float, default=0.2 )
+    parser.add_argument( '--kind', default='random' )
+    parser.add_argument( '--output', default=None, help="the JSON file to write" )
+    options = parser.parse_args( arguments )
+
+    print( "%d processors" % cores )
+    print( "%-6s %10s %8s %10s %8s %10s" % ( "size", "serial", "workers", "parallel",
+                                              "speedup", "vs serial" ) )
+    results = []
+    for result in speedups( options.sizes, options.workers, options.density, kind=options.kind ):
+        results.append( result )
+        one = result['parallel'].get( 1, result['serial'] )
+        for count, seconds in result['parallel'].items():
+            print( "%-6d %9.3fs %8d %9.3fs %7.2fx %9.2fx" % ( result['size'], result['serial'],
+                                                              count, seconds, one / seconds,
+                                                              result['serial'] / seconds ) )
+    if options.output != None:
+        with open( options.output, 'w' ) as file:
+            json.dump( results, file, indent=1 )
+
+if __name__ == '__main__':
+    main()
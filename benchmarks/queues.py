@@ -0,0 +1,165 @@
+"""
+This module compares the priority queues of the heap module,
+both on their own and as the queue of escape.findDJI, on the
+bundled test ponds and on larger generated ones. heap.IndexHeap
+only takes integer items, so it is timed on compact puzzles.
+
+    python -m benchmarks.queues
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import os
+import random
+import tempfile
+import time
+
+import escape
+import heap
+import pond
+from benchmarks.generate import generatePond, writePond
+
+# The bundled test ponds
+TEST_FILES = ( 'test1', 'test2', 'test3', 'test4.txt', 'test5.txt' )
+
+# Generated ponds, as ( height, width, density )
+GENERATED = ( (100, 100, 0.3), (300, 300, 0.2), (500, 500, 0.1) )
+
+# The number of findDJI searches timed on a generated pond
+SEARCHES = 20
+
+# The queues compared, in the order of the columns
+QUEUES = ( 'Heap', 'Bucket', 'IndexHeap' )
+
+def makeQueue( name, capacity ):
+    """
+    This function returns a class-like callable for a queue.
+    :param name: one of QUEUES
+    :param capacity: the number of integer ids IndexHeap must hold
+    :return: A callable that returns an empty queue
+    """
+    if name == 'Heap':
+        return heap.Heap
+    if name == 'Bucket':
+        return heap.BucketQueue
+    return lambda: heap.IndexHeap( capacity )
+
+def timeOperations( queue, count, seed=0 ):
+    """
+    This function times a Dijkstra-like mix of operations:
+    every item is inserted, a third have their keys decreased,
+    and then the queue is emptied.
+    :param queue: the queue class to time
+    :param count: the number of items
+    :param seed: the seed for the keys
+    :return: The time taken in seconds
+    """
+    rng = random.Random( seed )
+    keys = [ rng.randrange( 1, 64 ) for item in range( count ) ]
+
+    start = time.perf_counter()
+    q = queue()
+    for item in range( count ):
+        q.insert( item, keys[item] )
+    for item in range( 0, count, 3 ):
+        q.decreaseKey( item, keys[item] // 2 )
+    while q:
+        q.pop()
+    return time.perf_counter() - start
+
+def sample( starts, searches ):
+    """
+    This function picks the starting positions to search from.
+    :param starts: all the open positions
+    :param searches: how many to pick, or None for all of them
+    :return: A list of starting positions
+    """
+    if searches == None:
+        return starts
+    return random.Random( 0 ).sample( starts, min( searches, len( starts ) ) )
+
+def timeSearches( fileName, queue, searches=None ):
+    """
+    This function times findDJI with the given queue from
+    the open positions of a puzzle file.
+    :param fileName: the puzzle file
+    :param queue: the queue class to hand to findDJI
+    :param searches: the number of positions to search from,
+                     or None for all of them
+    :return: The time taken in seconds
+    """
+    height, width, escapeRow, text = escape.readTest( fileName )
+    puzzle = escape.buildPuzzle( text, width, height, escapeRow )
+    tables = escape.buildSlideTables( puzzle, width, height )
+    endVert = puzzle[escapeRow][width]
+    starts = [ node for row in puzzle for node in row[:width] if node != None ]
+
+    start = time.perf_counter()
+    for startVert in sample( starts, searches ):
+        escape.findDJI( startVert, endVert, tables, queue )
+    return time.perf_counter() - start
+
+def timeCompactSearches( fileName, name, searches=None ):
+    """
+    This function is timeSearches on a compact puzzle, where
+    the positions are integer cell ids.
+    :param fileName: the puzzle file
+    :param name: the name of the queue, one of QUEUES
+    :param searches: the number of positions to search from,
+                     or None for all of them
+    :return: The time taken in seconds
+    """
+    puzzle = pond.readCompact( fileName )
+    puzzle.buildStops()
+    queue = makeQueue( name, puzzle.exit + 1 )
+    starts = [ cell for cell in range( puzzle.exit ) if not puzzle.rocks[cell] ]
+
+    start = time.perf_counter()
+    for cell in sample( starts, searches ):
+        escape.findDJI( cell, puzzle.exit, puzzle, queue )
+    return time.perf_counter() - start
+
+def report( name, times ):
+    """
+    This function prints one line of the comparison, with the
+    speedup of the fastest queue over heap.Heap.
+    :param name: what was timed
+    :param times: the time taken with each queue, None if not timed
+    :return: None
+    """
+    best = min( time for time in times if time != None )
+    speedup = times[0] / best if best > 0 else float('inf')
+    columns = [ "%10s" % "-" if time == None else "%10.4f" % time for time in times ]
+    print( "%-28s %s %8.2fx" % ( name, " ".join( columns ), speedup ) )
+
+def main():
+    """
+    Runs the comparison and prints a table of times in seconds.
+    :return: None
+    """
+    print( "%-28s %s %9s" % ( "workload", " ".join( "%10s" % name for name in QUEUES ),
+                              "speedup" ) )
+
+    for count in ( 10000, 100000 ):
+        report( "operations x" + str(count),
+                [ timeOperations( makeQueue( name, count ), count ) for name in QUEUES ] )
+
+    for fileName in TEST_FILES:
+        report( "findDJI " + fileName + " (all)",
+                [ timeSearches( fileName, heap.Heap ),
+                  timeSearches( fileName, heap.BucketQueue ), None ] )
+        report( "  compact",
+                [ timeCompactSearches( fileName, name ) for name in QUEUES ] )
+
+    with tempfile.TemporaryDirectory() as directory:
+        for height, width, density in GENERATED:
+            fileName = os.path.join( directory, "pond.txt" )
+            writePond( fileName, *generatePond( height, width, density ) )
+            report( "findDJI %dx%d (%d)" % ( height, width, SEARCHES ),
+                    [ timeSearches( fileName, heap.Heap, SEARCHES ),
+                      timeSearches( fileName, heap.BucketQueue, SEARCHES ), None ] )
+            report( "  compact",
+                    [ timeCompactSearches( fileName, name, SEARCHES ) for name in QUEUES ] )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+This module compares the single query searches of the search
+module: how many positions each one expands, and how long it
+takes, against the full search of escape.findDJI.
+
+    python -m benchmarks.search
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import os
+import random
+import tempfile
+import time
+
+import escape
+import search
+from benchmarks.generate import generatePond, writePond
+from benchmarks.queues import GENERATED, TEST_FILES
+
+# The number of positions searched from on each pond
+QUERIES = 50
+
+def compareFile( fileName, queries=QUERIES ):
+    """
+    This function runs every search from a sample of the
+    positions of a puzzle file.
+    :param fileName: the puzzle file
+    :param queries: the number of positions to search from
+    :return: Dictionaries from modes to the total positions
+             expanded and to the total seconds taken
+    """
+    height, width, escapeRow, text = escape.readTest( fileName )
+    puzzle = escape.buildPuzzle( text, width, height, escapeRow )
+    tables = escape.buildSlideTables( puzzle, width, height )
+    endVert = puzzle[escapeRow][width]
+    starts = [ node for row in puzzle for node in row[:width] if node != None ]
+    starts = random.Random( 0 ).sample( starts, min( queries, len( starts ) ) )
+
+    expanded = dict.fromkeys( search.MODES, 0 )
+    seconds = dict.fromkeys( search.MODES, 0.0 )
+    for mode in search.MODES:
+        start = time.perf_counter()
+        for startVert in starts:
+            expanded[mode] += search.findPath( puzzle, startVert, endVert, tables, mode )[1]
+        seconds[mode] = time.perf_counter() - start
+    return expanded, seconds
+
+def report( name, expanded, seconds ):
+    """
+    This function prints the positions expanded by each search,
+    as a share of the full search, and the time taken.
+    :param name: the pond
+    :param expanded: the positions expanded by each mode
+    :param seconds: the seconds taken by each mode
+    :return: None
+    """
+    full = expanded['full'] or 1
+    columns = [ "%9d %5.1f%% %7.3fs" % ( expanded[mode], 100.0 * expanded[mode] / full,
+                                         seconds[mode] )
+                for mode in search.MODES ]
+    print( "%-16s %s" % ( name, "  ".join( columns ) ) )
+
+def main():
+    """
+    Runs the comparison and prints a table.
+    :return: None
+    """
+    print( "%-16s %s" % ( "pond", "  ".join( "%24s" % mode for mode in search.MODES ) ) )
+    for fileName in TEST_FILES:
+        report( fileName, *compareFile( fileName ) )
+
+    with tempfile.TemporaryDirectory() as directory:
+        for height, width, density in GENERATED:
+            fileName = os.path.join( directory, "pond.txt" )
+            writePond( fileName, *generatePond( height, width, density ) )
+            report( "%dx%d" % ( height, width ), *compareFile( fileName ) )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+This module is the scale benchmark suite. It generates ponds
+of each size and kind, times readTest, buildPuzzle, slide,
+findDJI, heap.Heap and the full solve on them, times how soon
+escape.streamingSpots hands out its first layer, measures the
+peak memory of the full solve with tracemalloc, and writes
+the results as JSON, so that runs of different versions can
+be compared.
+
+    python -m benchmarks.suite --sizes 50 100 200 --output results.json
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import escape
+import heap
+from benchmarks.generate import KINDS, generatePond, writePond
+
+# The side lengths of the generated square ponds
+SIZES = ( 25, 50, 100 )
+
+# The modes of escape.testingSpots timed as the full solve
+SOLVES = ( 'reverse', 'stops', 'reference' )
+
+# The number of slides and findDJI searches sampled per pond
+SAMPLES = 200
+SEARCHES = 5
+
+# The largest pond the reference solve is timed on, since it
+# searches once from every position
+REFERENCE_LIMIT = 50 * 50
+
+def timed( function, *arguments ):
+    """
+    This function calls a function once and times it.
+    :param function: the function to call
+    :param arguments: its arguments
+    :return: The seconds taken and what the function returned
+    """
+    start = time.perf_counter()
+    value = function( *arguments )
+    return time.perf_counter() - start, value
+
+def peakMemory( function, *arguments ):
+    """
+    This function calls a function once under tracemalloc.
+    :param function: the function to call
+    :param arguments: its arguments
+    :return: The peak number of bytes allocated during the call
+    """
+    tracemalloc.start()
+    try:
+        function( *arguments )
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def timeStream( fileName ):
+    """
+    This function times a solve with escape.streamingSpots.
+    :param fileName: the pond file
+    :return: The seconds until the first layer of moves was
+             handed out, and until the last
+    """
+    start = time.perf_counter()
+    first = None
+    for moves, spots in escape.streamingSpots( fileName ):
+        if first == None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+def timeHeap( count, seed=0 ):
+    """
+    This function times heap.Heap on a Dijkstra-like mix of
+    operations: every item is inserted, a third have their keys
+    decreased, and then the heap is emptied.
+    :param count: the number of items
+    :param seed: the seed for the keys
+    :return: The time taken in seconds
+    """
+    rng = random.Random( seed )
+    keys = [ rng.randrange( 1, 64 ) for item in range( count ) ]
+
+    start = time.perf_counter()
+    queue = heap.Heap()
+    for item in range( count ):
+        queue.insert( item, keys[item] )
+    for item in range( 0, count, 3 ):
+        queue.decreaseKey( item, keys[item] // 2 )
+    while queue.size > 0:
+        queue.pop()
+    return time.perf_counter() - start
+
+def benchmarkPond( fileName, height, width, rng ):
+    """
+    This function runs every harness on one pond file.
+    :param fileName: the pond file
+    :param height: the height of the pond
+    :param width: the width of the pond
+    :param rng: the random number generator for the samples
+    :return: A dictionary of the seconds taken by each
+             harness and the peak bytes of each full solve
+    """
+    result = {}
+    result['readTest'], ( readHeight, readWidth, escapeRow, text ) = \
+        timed( escape.readTest, fileName )
+    result['buildPuzzle'], puzzle = \
+        timed( escape.buildPuzzle, text, readWidth, readHeight, escapeRow )
+    tables = escape.buildSlideTables( puzzle, width, height )
+
+    # Slides from random open positions in random directions
+    starts = [ node for row in puzzle for node in row if node != None ]
+    moves = [ ( rng.choice( starts ), rng.choice( escape.DIRECTIONS ) )
+              for sample in range( SAMPLES ) ]
+    start = time.perf_counter()
+    for node, direction in moves:
+        escape.slide( node, direction )
+    result['slide'] = ( time.perf_counter() - start ) / SAMPLES
+
+    # Searches from random open positions to the exit
+    exit = puzzle[escapeRow][width]
+    sources = [ rng.choice( starts ) for search in range( SEARCHES ) ]
+    start = time.perf_counter()
+    for node in sources:
+        escape.findDJI( node, exit, tables )
+    result['findDJI'] = ( time.perf_counter() - start ) / SEARCHES
+
+    result['heap.Heap'] = timeHeap( height * width )
+
+    for mode in SOLVES:
+        if mode == 'reference' and height * width > REFERENCE_LIMIT:
+            continue
+        result['solve ' + mode], steps = timed( escape.testingSpots, fileName, mode )
+        result['memory ' + mode] = peakMemory( escape.testingSpots, fileName, mode )
+    result['first result stream'], result['solve stream'] = timeStream( fileName )
+    return result
+
+def versionInfo():
+    """
+    This function describes what is being benchmarked.
+    :return: A dictionary with the git revision, if there is
+             one, the Python version and the time of the run
+    """
+    try:
+        revision = subprocess.run( [ 'git', 'rev-parse', 'HEAD' ],
+                                   capture_output=True, text=True,
+                                   cwd=os.path.dirname( os.path.abspath( __file__ ) ) ).stdout.strip()
+    except OSError:
+        revision = ''
+    return { 'revision': revision or None,
+             'python': platform.python_version(),
+             'implementation': platform.python_implementation(),
+             'time': time.strftime( '%Y-%m-%dT%H:%M:%S%z' ) }
+
+def runSuite( sizes=SIZES, kinds=KINDS, density=0.3, seed=0 ):
+    """
+    This function generates a pond of each size and kind and
+    benchmarks it.
+    :param sizes: the side lengths of the ponds
+    :param kinds: the kinds of pond, see generate.KINDS
+    :param density: the rock density of random and walled ponds
+    :param seed: the seed of the ponds and samples
+    :return: A generator of one dictionary per pond
+    """
+    rng = random.Random( seed )
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            for kind in kinds:
+                height, width, escapeRow, rows = \
+                    generatePond( size, size, density, seed, kind=kind )
+                fileName = os.path.join( directory, kind + str( size ) )
+                writePond( fileName, height, width, escapeRow, rows )
+                result = { 'kind': kind, 'height': height, 'width': width,
+                           'density': density, 'seed': seed }
+                result.update( benchmarkPond( fileName, height, width, rng ) )
+                yield result
+
+def main( arguments=None ):
+    """
+    This function runs the suite and prints a line per pond,
+    and writes every result as JSON to a file or standard output.
+    :param arguments: the command line arguments, or None for sys.argv
+    :return: None
+    """
+    parser = argparse.ArgumentParser( description="Time the solver on generated ponds." )
+    parser.add_argument( '--sizes', type=int, nargs='+', default=list( SIZES ) )
+    parser.add_argument( '--kinds', nargs='+', choices=KINDS, default=list( KINDS ) )
+    parser.add_argument( '--density', type=float, default=0.3 )
+    parser.add_argument( '--seed', type=int, default=0 )
+    parser.add_argument( '--output', default=None,
+                         help="the JSON file to write, or standard output" )
+    options = parser.parse_args( arguments )
+
+    results = []
+    for result in runSuite( options.sizes, options.kinds, options.density, options.seed ):
+        results.append( result )
+        print( "%-7s %5dx%-5d solve %.4f s, %d KiB, first layer streamed after %.4f s" %
+               ( result['kind'], result['height'], result['width'],
+                 result['solve reverse'], result['memory reverse'] // 1024,
+                 result['first result stream'] ),
+               file=sys.stderr )
+
+    document = { 'version': versionInfo(), 'results': results }
+    if options.output != None:
+        with open( options.output, 'w' ) as file:
+            json.dump( document, file, indent=1 )
+    else:
+        print( json.dumps( document, indent=1 ) )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+"""
+This module stores ponds and their solutions in binary files
+that load without parsing.
+
+A pond file is a header followed by the rocks as a bitmap,
+one bit per position in cell id order, least significant bit
+first, so a 1000 x 1000 pond takes 122 KB instead of 977 KB
+of text. A result file is a header followed by the number of
+moves from every cell as unsigned 16 bit integers, NO_PATH
+where there is none, and then the first move of a shortest
+path from every cell as signed 32 bit integers, -1 where there
+is none, both indexed by cell id with the exit last, as in
+escape.PathTree.
+
+Both are memory mapped and the arrays are memoryviews of the
+map, so nothing is read until it is used. Convert with
+
+    python binary.py pond test1 test1.icep
+    python binary.py text test1.icep test1.txt
+    python binary.py solve test1 test1.icer
+    python binary.py show test1.icer test1.icep
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import mmap
+import struct
+import sys
+from array import array
+
+import escape
+import pond
+
+# The headers: magic, version, height, width and escape row
+POND_MAGIC = b'ICEP'
+RESULT_MAGIC = b'ICER'
+VERSION = 1
+HEADER = struct.Struct( '<4sIIII' )
+
+# The number of moves stored for a position with no path
+NO_PATH = 0xFFFF
+
+# Translation tables between rock flags and binary digits
+DIGITS = bytes( ord('1') if byte else ord('0') for byte in range( 256 ) )
+FLAGS = bytes( 1 if byte == ord('1') else 0 for byte in range( 256 ) )
+
+# The number of bytes of bitmap packed or unpacked at a time
+CHUNK = 1 << 16
+
+# Whether the arrays of the files can be used in place
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+class RockBits(object):
+    """
+    This class reads the rock bitmap of a pond file in place.
+    Indexing it by cell id gives the same 0 or 1 as the rocks
+    bytearray of a CompactPuzzle, so it can stand in for one.
+    """
+
+    __slots__ = 'bits', 'size'
+
+    def __init__( self, bits, size ):
+        """
+        The initialization method.
+        :param bits: the bitmap, such as a memoryview of a map
+        :param size: the number of positions
+        :return: None
+        """
+        self.bits = bits
+        self.size = size
+
+    def __len__( self ):
+        return self.size
+
+    def __getitem__( self, cell ):
+        """
+        This method reads the flag of one position.
+        :param cell: The id of the position
+        :return: 1 if the position is a rock, 0 if not
+        """
+        if not 0 <= cell < self.size:
+            raise IndexError( "cell " + str(cell) + " is outside the pond" )
+        return ( self.bits[cell >> 3] >> ( cell & 7 ) ) & 1
+
+    def unpack( self ):
+        """
+        This method expands the bitmap to one flag per position.
+        :return: A bytearray of rock flags
+        """
+        return unpackRocks( self.bits, self.size )
+
+def packRocks( rocks ):
+    """
+    This function packs rock flags into a bitmap. The flags
+    are written out as binary digits and read back as an
+    integer, so the work is done in C rather than per position,
+    one chunk of CHUNK bytes of bitmap at a time so that the
+    digits and integers stay small.
+    :param rocks: the rock flags, one byte per position
+    :return: The bitmap as bytes, ( len(rocks) + 7 ) // 8 long
+    """
+    size = ( len( rocks ) + 7 ) // 8
+    bits = bytearray( size )
+    for start in range( 0, size, CHUNK ):
+        end = min( start + CHUNK, size )
+        digits = bytes( rocks[start * 8:end * 8] ).translate( DIGITS )[::-1]
+        bits[start:end] = int( digits, 2 ).to_bytes( end - start, 'little' )
+    return bytes( bits )
+
+def unpackRocks( bits, size ):
+    """
+    This function is the reverse of packRocks, also done one
+    chunk at a time, so loading a pond only needs the flags
+    and a chunk of temporary memory.
+    :param bits: the bitmap
+    :param size: the number of positions
+    :return: A bytearray of size rock flags
+    """
+    rocks = bytearray( size )
+    for start in range( 0, ( size + 7 ) // 8, CHUNK ):
+        count = min( CHUNK * 8, size - start * 8 )
+        chunk = bits[start:start + ( count + 7 ) // 8]
+        digits = format( int.from_bytes( chunk, 'little' ), '0' + str(count) + 'b' )
+        rocks[start * 8:start * 8 + count] = digits[::-1].encode( 'ascii' ).translate( FLAGS )
+    return rocks
+
+def mapFile( fileName, magic ):
+    """
+    This function memory maps a binary file and checks its header.
+    :param fileName: The name of the file
+    :param magic: the magic bytes the file must start with
+    :return: The map, and the height, width and escape row
+    """
+    with open( fileName, 'rb' ) as file:
+        data = mmap.mmap( file.fileno(), 0, access=mmap.ACCESS_READ )
+    if len( data ) < HEADER.size:
+        data.close()
+        raise ValueError( fileName + " is too short to be a binary file" )
+    found, version, height, width, escape = HEADER.unpack_from( data )
+    if found != magic or version != VERSION:
+        data.close()
+        raise ValueError( fileName + " is not a version " + str(VERSION) +
+                          " " + magic.decode() + " file" )
+    return data, height, width, escape
+
+def isBinaryPond( fileName ):
+    """
+    This function checks whether a file is a binary pond.
+    :param fileName: The name of the file
+    :return: True if the file starts with POND_MAGIC
+    """
+    with open( fileName, 'rb' ) as file:
+        return file.read( len( POND_MAGIC ) ) == POND_MAGIC
+
+def writePond( fileName, puzzle ):
+    """
+    This function writes a compact puzzle as a binary pond.
+    :param fileName: The name of the file to write
+    :param puzzle: the CompactPuzzle
+    :return: None
+    """
+    if len( puzzle.exits ) > 1:
+        raise ValueError( "Binary ponds hold only one exit" )
+    with open( fileName, 'wb' ) as file:
+        file.write( HEADER.pack( POND_MAGIC, VERSION, puzzle.height,
+                                 puzzle.width, puzzle.escape ) )
+        if isinstance( puzzle.rocks, RockBits ):
+            file.write( puzzle.rocks.bits )
+        else:
+            file.write( packRocks( puzzle.rocks ) )
+
+def readPond( fileName, unpack=True ):
+    """
+    This function loads a binary pond.
+    :param fileName: The name of the file
+    :param unpack: whether to expand the bitmap to one flag
+                   per position, which makes the solvers faster,
+                   or to read the map in place with RockBits
+    :return: A CompactPuzzle
+    """
+    data, height, width, escape = mapFile( fileName, POND_MAGIC )
+    size = height * width
+    if len( data ) != HEADER.size + ( size + 7 ) // 8:
+        data.close()
+        raise ValueError( fileName + " does not hold " + str(size) + " positions" )
+    bits = memoryview( data )[HEADER.size:]
+    if unpack:
+        rocks = unpackRocks( bits, size )
+        bits.release()
+        data.close()
+    else:
+        rocks = RockBits( bits, size )
+    return pond.CompactPuzzle( height, width, escape, rocks )
+
+def writeText( fileName, puzzle ):
+    """
+    This function writes a compact puzzle in the text format
+    read by escape.readTest.
+    :param fileName: The name of the file to write
+    :param puzzle: the CompactPuzzle
+    :return: None
+    """
+    rocks = puzzle.rocks
+    if isinstance( rocks, RockBits ):
+        rocks = rocks.unpack()
+    toText = bytes( ord('*') if byte else ord('.') for byte in range( 256 ) )
+    with open( fileName, 'wb' ) as file:
+        file.write( ( str(puzzle.height) + " " + str(puzzle.width) + " " +
+                      str(puzzle.escape) + "\n" ).encode( 'ascii' ) )
+        for base in range( 0, puzzle.height * puzzle.width, puzzle.width ):
+            file.write( bytes( rocks[base:base + puzzle.width] ).translate( toText ) + b'\n' )
+
+class StoredTree(escape.PathTree):
+    """
+    This class is a PathTree read from a result file. Its
+    arrays are views of the map, so opening it costs nothing
+    and a cell is only read when it is asked about.
+    """
+
+    __slots__ = 'data',
+
+    def __init__( self, puzzle, dist, next, data=None ):
+        """
+        The initialization method.
+        :param puzzle: a CompactPuzzle with the dimensions of the
+                       result, whose rocks may be unknown
+        :param dist: the moves needed from every cell, NO_PATH if none
+        :param next: the first move from every cell, -1 if none
+        :param data: the map the arrays are views of, if any
+        :return: None
+        """
+        escape.PathTree.__init__( self, puzzle, dist, next )
+        self.data = data
+
+    def distance( self, cell ):
+        """
+        This method returns the number of moves from a position.
+        :param cell: The id of the position
+        :return: The number of moves, or -1 if there is no path
+        """
+        moves = self.dist[cell]
+        return -1 if moves == NO_PATH else moves
+
+    def distances( self ):
+        """
+        This method copies the moves into an escape.PathTree
+        style array.
+        :return: An array of the moves from every cell, -1 if none
+        """
+        dist = array( 'l', self.dist )
+        for cell in range( len( dist ) ):
+            if dist[cell] == NO_PATH:
+                dist[cell] = -1
+        return dist
+
+    def close( self ):
+        """
+        This method releases the views and unmaps the file.
+        The tree cannot be used afterwards.
+        :return: None
+        """
+        if self.data != None:
+            self.dist.release()
+            self.next.release()
+            self.data.close()
+            self.data = None
+
+def writeResult( fileName, tree ):
+    """
+    This function writes the PathTree of a solved puzzle as
+    a result file.
+    :param fileName: The name of the file to write
+    :param tree: the PathTree, as returned by escape.solveCompact
+    :return: None
+    """
+    puzzle = tree.puzzle
+    if len( puzzle.exits ) > 1:
+        raise ValueError( "Result files hold only one exit" )
+    dist = array( 'H', [NO_PATH] ) * ( puzzle.exit + 1 )
+    for cell in range( puzzle.exit + 1 ):
+        moves = tree.distance( cell )
+        if moves >= NO_PATH:
+            raise ValueError( "Position " + str(cell) + " needs " + str(moves) +
+                              " moves, more than a result file can hold" )
+        if moves != -1:
+            dist[cell] = moves
+    next = array( 'i', tree.next )
+    if not LITTLE_ENDIAN:
+        dist.byteswap()
+        next.byteswap()
+
+    with open( fileName, 'wb' ) as file:
+        file.write( HEADER.pack( RESULT_MAGIC, VERSION, puzzle.height,
+                                 puzzle.width, puzzle.escape ) )
+        file.write( dist.tobytes() )
+        file.write( next.tobytes() )
+
+def readResult( fileName, puzzle=None ):
+    """
+    This function loads a result file.
+    :param fileName: The name of the file
+    :param puzzle: the CompactPuzzle that was solved, or None
+                   if only distances and paths are wanted
+    :return: A StoredTree
+    """
+    data, height, width, escape = mapFile( fileName, RESULT_MAGIC )
+    cells = height * width + 1
+    if len( data ) != HEADER.size + cells * 6:
+        data.close()
+        raise ValueError( fileName + " does not hold " + str(cells) + " cells" )
+    if puzzle == None:
+        puzzle = pond.CompactPuzzle( height, width, escape, None )
+    elif ( puzzle.height, puzzle.width, puzzle.escape ) != ( height, width, escape ):
+        data.close()
+        raise ValueError( fileName + " is not a result for this puzzle" )
+
+    split = HEADER.size + cells * 2
+    if LITTLE_ENDIAN:
+        view = memoryview( data )
+        return StoredTree( puzzle, view[HEADER.size:split].cast( 'H' ),
+                           view[split:].cast( 'i' ), data )
+
+    # Other machines swap a copy of the arrays
+    dist = array( 'H', data[HEADER.size:split] )
+    next = array( 'i', data[split:] )
+    dist.byteswap()
+    next.byteswap()
+    data.close()
+    return StoredTree( puzzle, dist, next )
+
+def main( arguments=None ):
+    """
+    This function converts between the text and binary formats.
+    :param arguments: the command line arguments, or None for sys.argv
+    :return: None
+    """
+    arguments = sys.argv[1:] if arguments == None else arguments
+    if len( arguments ) == 3 and arguments[0] == 'pond':
+        writePond( arguments[2], pond.readCompact( arguments[1] ) )
+    elif len( arguments ) == 3 and arguments[0] == 'text':
+        writeText( arguments[2], pond.readCompact( arguments[1] ) )
+    elif len( arguments ) == 3 and arguments[0] == 'solve':
+        writeResult( arguments[2], escape.solveCompact( pond.readCompact( arguments[1] ) ) )
+    elif len( arguments ) == 3 and arguments[0] == 'show':
+        puzzle = pond.readCompact( arguments[2] )
+        tree = readResult( arguments[1], puzzle )
+        escape.printResults( escape.stepsFromDistances( tree.distances(), puzzle ) )
+        tree.close()
+    else:
+        print( "usage: python binary.py pond|text|solve INPUT OUTPUT\n"
+               "       python binary.py show RESULT POND" )
+
+if __name__ == '__main__':
+    main()
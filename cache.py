@@ -0,0 +1,182 @@
+"""
+This module caches solved frozen pond puzzles. A puzzle is
+identified by a hash of its dimensions, escape row and rocks,
+so the same pond is only solved once however its file is
+named or laid out. Solutions are kept in two tiers: a small
+least recently used cache in memory, and an sqlite database
+on disk that is trimmed to a size limit, oldest use first.
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import hashlib
+import os
+import sqlite3
+import struct
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+import escape
+
+# Where the disk tier is kept unless told otherwise
+DEFAULT_DIRECTORY = os.path.join( os.path.expanduser( '~' ), '.cache', 'ice-puzzle' )
+
+def puzzleKey( puzzle ):
+    """
+    This function hashes a compact puzzle.
+    :param puzzle: a pond.CompactPuzzle
+    :return: The hash as a string of hex digits
+    """
+    digest = hashlib.sha256()
+    digest.update( struct.pack( '<qqq', puzzle.height, puzzle.width, puzzle.escape ) )
+    digest.update( puzzle.rocks )
+
+    # Ponds with one exit keep the keys they had before
+    # other exits could be listed
+    if len( puzzle.exits ) > 1:
+        digest.update( repr( puzzle.exits[1:] ).encode( 'ascii' ) )
+    return digest.hexdigest()
+
+class ResultCache(object):
+    """
+    This class is a two tier cache from puzzles to the number
+    of moves needed from every position, as computed by
+    escape.solveCompact.
+    """
+
+    __slots__ = 'memory', 'memoryEntries', 'database', 'diskBytes', 'stats'
+
+    def __init__( self, directory=DEFAULT_DIRECTORY, memoryEntries=64,
+                  diskBytes=256 * 1024 * 1024 ):
+        """
+        The initialization method.
+        :param directory: where to keep the disk tier, or None
+                          to keep everything in memory
+        :param memoryEntries: how many puzzles to keep in memory
+        :param diskBytes: the most bytes of results to keep on disk
+        :return: None
+        """
+        self.memory = OrderedDict()
+        self.memoryEntries = memoryEntries
+        self.diskBytes = diskBytes
+        self.stats = { 'memory': 0, 'disk': 0, 'miss': 0, 'evicted': 0 }
+        self.database = None
+
+        if directory != None:
+            os.makedirs( directory, exist_ok=True )
+            self.database = sqlite3.connect( os.path.join( directory, 'results.sqlite' ),
+                                             timeout=30 )
+            self.database.execute(
+                "CREATE TABLE IF NOT EXISTS results ( key TEXT PRIMARY KEY, "
+                "dist BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL )" )
+            self.database.commit()
+
+    def get( self, puzzle ):
+        """
+        This method looks a puzzle up, first in memory and
+        then on disk.
+        :param puzzle: a pond.CompactPuzzle
+        :return: The array of moves, or None if the puzzle is not
+                 cached, and which tier it came from
+        """
+        key = puzzleKey( puzzle )
+
+        dist = self.memory.get( key )
+        if dist != None:
+            self.memory.move_to_end( key )
+            self.stats['memory'] += 1
+            return dist, 'memory'
+
+        if self.database != None:
+            row = self.database.execute(
+                "SELECT dist FROM results WHERE key = ?", ( key, ) ).fetchone()
+            if row != None:
+                self.database.execute(
+                    "UPDATE results SET used = ? WHERE key = ?", ( time.time(), key ) )
+                self.database.commit()
+                dist = array( 'i' )
+                dist.frombytes( zlib.decompress( row[0] ) )
+                self.remember( key, dist )
+                self.stats['disk'] += 1
+                return dist, 'disk'
+
+        self.stats['miss'] += 1
+        return None, 'miss'
+
+    def put( self, puzzle, dist ):
+        """
+        This method stores the solution of a puzzle in both tiers.
+        :param puzzle: a pond.CompactPuzzle
+        :param dist: the moves needed from every cell, -1 if none
+        :return: None
+        """
+        key = puzzleKey( puzzle )
+        dist = array( 'i', dist )
+        self.remember( key, dist )
+
+        if self.database != None:
+            blob = zlib.compress( dist.tobytes() )
+            self.database.execute(
+                "INSERT OR REPLACE INTO results VALUES ( ?, ?, ?, ? )",
+                ( key, blob, len( blob ), time.time() ) )
+            self.evict()
+            self.database.commit()
+
+    def remember( self, key, dist ):
+        """
+        This method adds a solution to the memory tier, dropping
+        the least recently used one if it is full.
+        :param key: the hash of the puzzle
+        :param dist: the array of moves
+        :return: None
+        """
+        self.memory[key] = dist
+        self.memory.move_to_end( key )
+        while len( self.memory ) > self.memoryEntries:
+            self.memory.popitem( last=False )
+
+    def evict( self ):
+        """
+        This method deletes the least recently used solutions
+        from disk until they fit in the size limit.
+        :return: None
+        """
+        total = self.database.execute( "SELECT TOTAL(size) FROM results" ).fetchone()[0]
+        while total > self.diskBytes:
+            key, size = self.database.execute(
+                "SELECT key, size FROM results ORDER BY used LIMIT 1" ).fetchone()
+            self.database.execute( "DELETE FROM results WHERE key = ?", ( key, ) )
+            self.stats['evicted'] += 1
+            total -= size
+
+    def solve( self, puzzle, solver=None ):
+        """
+        This method returns the solution of a puzzle, solving
+        and storing it if it is not cached.
+        :param puzzle: a pond.CompactPuzzle
+        :param solver: a function from the puzzle to the moves
+                       needed from every cell, such as
+                       escape.modeSolver gives, or None for
+                       escape.solveCompact
+        :return: The array of moves, and the tier it came from
+                 ( 'memory', 'disk' or 'miss' )
+        """
+        dist, source = self.get( puzzle )
+        if dist == None:
+            if solver == None:
+                dist = escape.solveCompact( puzzle ).dist
+            else:
+                dist = solver( puzzle )
+            self.put( puzzle, dist )
+        return dist, source
+
+    def close( self ):
+        """
+        This method closes the disk tier.
+        :return: None
+        """
+        if self.database != None:
+            self.database.close()
+            self.database = None
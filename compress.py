@@ -0,0 +1,173 @@
+"""
+This module solves a frozen pond puzzle on a smaller graph.
+A slide can only stop next to a rock or the edge of the pond,
+so most open positions are never the end of a move; they are
+only ever starting points. The stop graph keeps just the
+positions where a slide can stop, and the exit, with an edge
+for each slide. Once it is solved, any other position needs
+one move more than the best of its four slides.
+
+Run it on puzzle files to see how much smaller the graph is:
+
+    python compress.py test1 test2 test5.txt
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import sys
+from collections import deque
+
+import escape
+
+class StopGraph(object):
+    """
+    This class is the graph of the positions where a slide can
+    stop. Vertices are numbered, with the exit as vertex 0.
+    """
+
+    __slots__ = 'stops', 'index', 'targets', 'openCells'
+
+    def __init__( self, stops, index, targets, openCells ):
+        """
+        The initialization method.
+        :param stops: the node objects of the vertices, in order
+        :param index: a dictionary from node objects to vertices
+        :param targets: for every vertex, the vertices its four
+                        slides end at
+        :param openCells: the number of open positions in the pond
+        :return: None
+        """
+        self.stops = stops
+        self.index = index
+        self.targets = targets
+        self.openCells = openCells
+
+    def ratio( self ):
+        """
+        This method returns how many open positions there are
+        per vertex of the graph.
+        :return: The compression ratio
+        """
+        return self.openCells / len( self.stops ) if self.stops else 0.0
+
+def isStop( position ):
+    """
+    This function checks whether a slide can end at a position,
+    that is whether it has a rock or the edge on some side.
+    :param position: a node object
+    :return: True if the position can be the end of a slide
+    """
+    return position.left == None or position.right == None or \
+        position.up == None or position.down == None
+
+def buildStopGraph( puzzle, puzzleWidth, puzzleHeight, escapeRow, tables ):
+    """
+    This function builds the stop graph of a puzzle.
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param puzzleWidth: the width of the puzzle
+    :param puzzleHeight: the height of the puzzle
+    :param escapeRow: the row where the escape node is located
+    :param tables: the SlideTables of the puzzle
+    :return: The StopGraph, or None if the exit is blocked
+    """
+    endVert = puzzle[escapeRow][puzzleWidth]
+    if endVert == None:
+        return None
+
+    stops = [ endVert ]
+    openCells = 0
+    for row in range( puzzleHeight ):
+        for column in range( puzzleWidth ):
+            position = puzzle[row][column]
+            if position != None:
+                openCells += 1
+                if isStop( position ):
+                    stops.append( position )
+
+    index = { position: vertex for vertex, position in enumerate( stops ) }
+    targets = [ tuple( index[ escape.slide( position, direction, tables ) ]
+                       for direction in escape.DIRECTIONS )
+                for position in stops ]
+    return StopGraph( stops, index, targets, openCells )
+
+def solveStops( graph ):
+    """
+    This function finds the number of moves from every vertex
+    of a stop graph to the exit, searching backwards from it.
+    :param graph: a StopGraph
+    :return: A list of moves per vertex, None where there is no path
+    """
+    sources = [ [] for vertex in graph.stops ]
+    for vertex, ends in enumerate( graph.targets ):
+        for end in ends:
+            if end != vertex:
+                sources[end].append( vertex )
+
+    moves = [ None ] * len( graph.stops )
+    moves[0] = 0
+    q = deque([0])
+    while (q):
+        current = q.popleft()
+        for n in sources[current]:
+            if moves[n] == None:
+                moves[n] = moves[current] + 1
+                q.append(n)
+    return moves
+
+def solveCompressed( puzzle, puzzleWidth, puzzleHeight, escapeRow ):
+    """
+    This function is escape.solveAll on the stop graph. The
+    other positions each take one lookup per direction.
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param puzzleWidth: the width of the puzzle
+    :param puzzleHeight: the height of the puzzle
+    :param escapeRow: the row where the escape node is located
+    :return: A dictionary from node objects to the number of moves
+             needed to reach the exit, leaving out positions with
+             no path
+    """
+    tables = escape.buildSlideTables( puzzle, puzzleWidth, puzzleHeight )
+    graph = buildStopGraph( puzzle, puzzleWidth, puzzleHeight, escapeRow, tables )
+    dist = {}
+    if graph == None:
+        return dist
+
+    moves = solveStops( graph )
+    for vertex, position in enumerate( graph.stops ):
+        if moves[vertex] != None:
+            dist[position] = moves[vertex]
+
+    for row in range( puzzleHeight ):
+        for column in range( puzzleWidth ):
+            position = puzzle[row][column]
+            if position == None or position in graph.index:
+                continue
+            best = None
+            for direction in escape.DIRECTIONS:
+                end = moves[ graph.index[ escape.slide( position, direction, tables ) ] ]
+                if end != None and ( best == None or end < best ):
+                    best = end
+            if best != None:
+                dist[position] = best + 1
+    return dist
+
+def main():
+    """
+    Prints the size of the stop graph of every puzzle file named
+    on the command line.
+    :return: None
+    """
+    print( "%-20s %10s %10s %8s" % ( "puzzle", "open", "stops", "ratio" ) )
+    for fileName in sys.argv[1:]:
+        height, width, escapeRow, text = escape.readTest( fileName )
+        puzzle = escape.buildPuzzle( text, width, height, escapeRow )
+        tables = escape.buildSlideTables( puzzle, width, height )
+        graph = buildStopGraph( puzzle, width, height, escapeRow, tables )
+        if graph == None:
+            print( "%-20s %10s" % ( fileName, "exit blocked" ) )
+        else:
+            print( "%-20s %10d %10d %7.2fx" % ( fileName, graph.openCells,
+                                                len( graph.stops ), graph.ratio() ) )
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,22 @@ Authors:  (11/16/2016) Adam Purtee @ RIT CS
 
 __author__ = 'Amit Maller', 'Kyle McGlynn'
 
+import argparse
+import sys
+import time
+
 import heap
+import instrument
+import pond
+import results
+from array import array
+from collections import deque
+
+# The directions in which a position can slide
+DIRECTIONS = ('left', 'up', 'right', 'down')
+
+# The direction that undoes each direction
+OPPOSITE = {'left': 'right', 'right': 'left', 'up': 'down', 'down': 'up'}
 
 class Node(object):
     """
@@ -70,16 +85,25 @@ def readTest( fileName ):
         # Get the lines of the file
         lines = file.readlines()
 
-        # Get the dimensions and escape row
-        numbers = lines[0].split()
-        height = int(numbers[0])
-        width = int(numbers[1])
-        escape = int(numbers[2])
+        # Get the dimensions and escape row, checked the same
+        # way as by pond.readCompact
+        height, width, escape, exits = pond.readHeader( lines[0] )
+        if len( exits ) > 0:
+            raise ValueError( "Puzzles with more than one exit are only read "
+                              "by pond.readCompact, use --compact" )
 
         # Create a 2d array to hold the textual representation of the puzzle
         text = [[' ' for column in range(width)] for row in range(height)]
         for line in range( height):
+            if line + 1 >= len( lines ):
+                raise ValueError( "Expected " + str(height) + " rows, found " + str(line) )
+            if len( lines[line+1].rstrip( '\r\n' ) ) != width:
+                raise ValueError( "Row " + str(line) + " has " +
+                                  str(len( lines[line+1].rstrip( '\r\n' ) )) +
+                                  " positions, expected " + str(width) )
             text[line] = list(lines[line+1])
+        if "".join( lines[height+1:] ).strip():
+            raise ValueError( "Found more than " + str(height) + " rows" )
 
     return height, width, escape, text
 
@@ -141,16 +165,111 @@ def buildPuzzle( puzzleText, puzzleWidth,
                 puzzle[row][column] = position
     return puzzle
 
-def slide( start, direction):
+class SlideTables(object):
+    """
+    This class holds, for each direction, a 2d array that gives
+    the position where a slide from every position stops. The
+    arrays have the same shape as the puzzle, so a slide becomes
+    a single lookup instead of a walk along the pond.
+    """
+
+    __slots__ = 'left', 'right', 'up', 'down'
+
+    def __init__( self, left, right, up, down ):
+        """
+        The initialization method.
+        :param left: The stops when sliding left
+        :param right: The stops when sliding right
+        :param up: The stops when sliding up
+        :param down: The stops when sliding down
+        :return: None
+        """
+        self.left = left
+        self.right = right
+        self.up = up
+        self.down = down
+
+    def slide( self, start, direction ):
+        """
+        This method looks up where a slide stops.
+        :param start: The starting position
+        :param direction: The direction in which we are sliding
+        :return: The position where we stop sliding
+        """
+        return getattr( self, direction )[start.row][start.column]
+
+def buildSlideTables( puzzle, puzzleWidth, puzzleHeight ):
+    """
+    This function precomputes where every slide in the puzzle
+    stops. Each direction takes a single sweep over the puzzle
+    against the direction of the slide, carrying along the last
+    position that had a rock or the edge on its far side. The
+    whole precomputation is O(height * width).
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param puzzleWidth: the width of the puzzle
+    :param puzzleHeight: the height of the puzzle
+    :return: The SlideTables of the puzzle
+    """
+
+    # The escape node lives in the extra column, so it is swept too
+    columns = range( puzzleWidth + 1 )
+    rows = range( puzzleHeight )
+
+    tables = SlideTables(
+        [[None for column in columns] for row in rows],
+        [[None for column in columns] for row in rows],
+        [[None for column in columns] for row in rows],
+        [[None for column in columns] for row in rows] )
+
+    # Sweep each row both ways
+    for row in rows:
+        stop = None
+        for column in columns:
+            position = puzzle[row][column]
+            if position != None and position.left == None:
+                stop = position
+            tables.left[row][column] = stop if position != None else None
+
+        stop = None
+        for column in reversed( columns ):
+            position = puzzle[row][column]
+            if position != None and position.right == None:
+                stop = position
+            tables.right[row][column] = stop if position != None else None
+
+    # Sweep each column both ways
+    for column in columns:
+        stop = None
+        for row in rows:
+            position = puzzle[row][column]
+            if position != None and position.up == None:
+                stop = position
+            tables.up[row][column] = stop if position != None else None
+
+        stop = None
+        for row in reversed( rows ):
+            position = puzzle[row][column]
+            if position != None and position.down == None:
+                stop = position
+            tables.down[row][column] = stop if position != None else None
+
+    return tables
+
+def slide( start, direction, tables=None ):
     """
     This function simulates sliding along a frozen
     pond from a starting position until hitting
     a rock or the edge of the pond.
     :param start: The starting position
     :param direction: The direciton in which we are sliding
+    :param tables: Optional precomputed SlideTables. If given,
+                   the slide is a single lookup.
     :return: The position where we stop sliding
     """
 
+    if tables != None:
+        return tables.slide( start, direction )
+
     # The current position, initialized to the
     # starting position
     current = start
@@ -173,55 +292,97 @@ def slide( start, direction):
 
     return current
 
+def slidesInto( puzzle, stop, direction ):
+    """
+    This function is the reverse of slide. It finds every
+    position that stops at the given position when sliding
+    in the given direction. Such positions all lie in the
+    lane behind the stop, so they are found by walking
+    backwards from the stop until hitting a rock or the edge.
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param stop: The position where the slide ends
+    :param direction: The direction in which we are sliding
+    :return: A list of the positions that slide into stop
+    """
+
+    starts = list()
+
+    # If the slide would carry on past this position,
+    # nothing stops here
+    if getattr( stop, direction ) != None:
+        return starts
+
+    # The escape node sits just past the last column and is
+    # not linked back to the pond, so its lane is walked from
+    # the last column of its row
+    lastColumn = len( puzzle[stop.row] ) - 2
+    current = stop
+    if stop.column > lastColumn:
+        if direction != 'right':
+            return starts
+        current = puzzle[stop.row][lastColumn]
+
+    # Walk backwards, never stepping onto the escape node
+    backwards = OPPOSITE[direction]
+    while current != None and current.column <= lastColumn:
+        starts.append( current )
+        current = getattr( current, backwards )
+
+    return starts
+
 def backtrack(start, current, prev):
     """
     Helper function to follow backpointers and build a path list.
+    The backpointers are followed in a loop rather than by
+    recursion, so long paths cannot overflow the stack.
     :param start:    The source node.
     :param current:  An intermediate node in the path.
     :param prev:     A dictionary from nodes to previous nodes.
     :return:         A list of node objects.
     """
-    if current != start:
-        v = prev[current]
-        return backtrack(start, v, prev) + [current]
-    else:
-        return [start]
-
-
-def findDJI(startVert, endVert ):
+    path = [current]
+    while current != start:
+        current = prev[current]
+        path.append(current)
+    path.reverse()
+    return path
+
+def searchDJI(startVert, tables=None, queue=heap.Heap, endVert=None, ends=None ):
     """
-    An implementation of Djikstra's algorithm for computing
-    shortest paths.   Given a binomial heap supporting decreaseKey
-    in O(log N) time, the run time of this algorithm is O((V + E)*log(V)).
-
-    Note that this does not work with negative cost edges.
-
-    #####################################################################
-    Modification by Amit Maller and Kyle McGlynn:
-    This method has been altered to find the shortest path
-    between a given position on the frozen pond and the exit.
-    #####################################################################
-
+    The search behind findDJI. It explores everything that can
+    be reached from the source node, or stops once the given
+    destination, or any one of the given destinations, is the
+    closest node left, since its distance can no longer change.
     :param startVert:  the source node object
-    :param endVert:    the destination node object
-    :return:           A list of node objects corresponding to the
-                       shortest weighted path if a path exists.  Otherwise,
-                       returns None.
+    :param tables:     Optional SlideTables, see findDJI
+    :param queue:      The priority queue class, see findDJI
+    :param endVert:    An optional node to stop at
+    :param ends:       An optional collection of nodes to stop
+                       at the first of
+    :return:           A dictionary from nodes to their number of
+                       moves from the source, and a dictionary from
+                       nodes to previous nodes.
     """
 
+    # Count the work, if asked to, without slowing down the
+    # search when not
+    if instrument.enabled:
+        queue = instrument.countingQueue( queue )
+        tables = instrument.CountingSlides( tables, slide )
+
     dist = {}
     dist[startVert] = 0
     prev = {}
     prev[startVert] = None
-    q = heap.Heap()
+    q = queue()
     q.insert(startVert, dist[startVert])
 
-    last = None
-
     while (q):
 
         # current is the next unvisited, closest node to start
         current = q.pop()
+        if current == endVert or ( ends != None and current in ends ):
+            break
 
         # A list of positions that can be reached from
         # current by moving left, up, right, or down.
@@ -229,10 +390,10 @@ def findDJI(startVert, endVert ):
 
         # Use the slide method to determine where
         # we will stop after moving from the current position
-        stops.append( slide( current, 'left' ) )
-        stops.append( slide( current, 'up' ) )
-        stops.append( slide( current, 'right' ) )
-        stops.append( slide( current, 'down' ) )
+        stops.append( slide( current, 'left', tables ) )
+        stops.append( slide( current, 'up', tables ) )
+        stops.append( slide( current, 'right', tables ) )
+        stops.append( slide( current, 'down', tables ) )
 
         # check to see if we found a better path to any
         # of current's neighbors
@@ -254,70 +415,666 @@ def findDJI(startVert, endVert ):
                 dist[n] = dist[current] + 1
                 prev[n] = current
                 q.decreaseKey(n, dist[n])
+
+    if instrument.enabled:
+        instrument.count( 'nodes expanded', len( dist ) )
+    return dist, prev
+
+def findDJI(startVert, endVert, tables=None, queue=heap.Heap ):
+    """
+    An implementation of Djikstra's algorithm for computing
+    shortest paths.   Given a binomial heap supporting decreaseKey
+    in O(log N) time, the run time of this algorithm is O((V + E)*log(V)).
+
+    Note that this does not work with negative cost edges.
+
+    #####################################################################
+    Modification by Amit Maller and Kyle McGlynn:
+    This method has been altered to find the shortest path
+    between a given position on the frozen pond and the exit.
+    #####################################################################
+
+    :param startVert:  the source node object
+    :param endVert:    the destination node object
+    :param tables:     Optional SlideTables, see buildSlideTables.
+                       Without them every slide walks the pond.
+    :param queue:      The priority queue class to use. Since every
+                       move costs one, heap.BucketQueue may be used
+                       in place of the default heap.Heap, and for
+                       integer cell ids heap.IndexHeap.
+    :return:           A list of node objects corresponding to the
+                       shortest weighted path if a path exists.  Otherwise,
+                       returns None.
+    """
+
+    dist, prev = searchDJI( startVert, tables, queue, endVert )
     if endVert in dist:
         return backtrack(startVert, endVert, prev)
     else:
         return None
 
-def testingSpots( testFileName ):
+def findDistance(startVert, endVert, tables=None, queue=heap.Heap ):
+    """
+    This function is findDJI for when only the number of moves
+    is needed, so no path is built.
+    :param startVert:  the source node object
+    :param endVert:    the destination node object
+    :param tables:     Optional SlideTables, see findDJI
+    :param queue:      The priority queue class, see findDJI
+    :return:           The number of moves from the source to the
+                       destination, or None if there is no path.
+    """
+    dist, prev = searchDJI( startVert, tables, queue, endVert )
+    return dist.get( endVert )
+
+def solveAll( puzzle, puzzleWidth, escapeRow ):
+    """
+    This function finds the number of moves needed to reach
+    the exit from every position of the puzzle in a single
+    pass. Rather than searching forwards from every position,
+    it searches backwards from the escape node over reversed
+    slides. Since every move costs one, a breadth first search
+    settles the positions in order of their distance, and the
+    whole puzzle is solved in O(V + E) time.
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param puzzleWidth: the width of the puzzle
+    :param escapeRow: the row where the escape node is located
+    :return: A dictionary from node objects to the number of moves
+             needed to reach the exit. Positions with no path to
+             the exit are left out.
+    """
+
+    dist = {}
+    endVert = puzzle[escapeRow][puzzleWidth]
+
+    # If the escape position is a rock, nothing can escape
+    if endVert == None:
+        return dist
+
+    dist[endVert] = 0
+    q = deque([endVert])
+    walk = slidesInto
+    if instrument.enabled:
+        walk = instrument.countingSlidesInto( slidesInto )
+
+    while (q):
+
+        # current is the next settled node, closest to the exit
+        current = q.popleft()
+
+        # Any position that slides into current is one move
+        # further from the exit than current
+        for direction in DIRECTIONS:
+            for n in walk( puzzle, current, direction ):
+                if n not in dist:
+                    dist[n] = dist[current] + 1
+                    q.append(n)
+
+    if instrument.enabled:
+        instrument.countLayers( dist.values() )
+    return dist
+
+class PathTree(object):
+    """
+    This class is the shortest path tree of a whole compact
+    puzzle, as found by solveCompact. Every position has the
+    number of moves it needs and the position its first move
+    reaches, each kept in a flat array indexed by cell id.
+    Paths are only built when asked for, by following the
+    first moves, so all the positions share the one tree.
+    """
+
+    __slots__ = 'puzzle', 'dist', 'next', 'via'
+
+    def __init__( self, puzzle, dist, next, via=None ):
+        """
+        The initialization method.
+        :param puzzle: the CompactPuzzle that was solved
+        :param dist: the moves needed from every cell, -1 if none
+        :param next: the cell reached by the first move of a
+                     shortest path from every cell, -1 if none
+        :param via: the exit nearest to every cell, -1 if none,
+                    or None if the puzzle has only the one exit
+        :return: None
+        """
+        self.puzzle = puzzle
+        self.dist = dist
+        self.next = next
+        self.via = via
+
+    def distance( self, cell ):
+        """
+        This method returns the number of moves from a position.
+        :param cell: The id of the position
+        :return: The number of moves, or -1 if there is no path
+        """
+        return self.dist[cell]
+
+    def nearestExit( self, cell ):
+        """
+        This method returns the exit that the shortest paths
+        from a position lead to.
+        :param cell: The id of the position
+        :return: The id of the exit, or -1 if there is no path
+        """
+        if self.via != None:
+            return self.via[cell]
+        return -1 if self.distance( cell ) == -1 else self.puzzle.exit
+
+    def path( self, cell ):
+        """
+        This generator yields the positions of a shortest path
+        from the given position to the nearest exit, one at a
+        time. Nothing is yielded if there is no path.
+        :param cell: The id of the starting position
+        :return: A generator of cell ids, ending with the exit
+        """
+        if self.distance( cell ) == -1:
+            return
+        exit = self.puzzle.exit
+        while cell < exit:
+            yield cell
+            cell = self.next[cell]
+        yield cell
+
+    def pathArray( self, cell ):
+        """
+        This method builds a shortest path all at once.
+        :param cell: The id of the starting position
+        :return: An array of the cell ids of the path, from the
+                 position to the exit, or None if there is no path
+        """
+        moves = self.distance( cell )
+        if moves == -1:
+            return None
+        path = array( 'l', [0] ) * ( moves + 1 )
+        for step, position in enumerate( self.path( cell ) ):
+            path[step] = position
+        return path
+
+def solveCompact( puzzle ):
+    """
+    This function is solveAll for a pond.CompactPuzzle. It
+    searches backwards from the exit over reversed slides and
+    finds the number of moves needed from every position.
+    A puzzle with several exits is searched from all of them
+    at once, which costs no more than searching from one, and
+    every position also learns which exit is nearest.
+    :param puzzle: the CompactPuzzle to solve
+    :return: The PathTree of the puzzle
+    """
+
+    dist = array( 'l', [-1] ) * puzzle.size
+    next = array( 'l', [-1] ) * puzzle.size
+    exits = range( puzzle.exit, puzzle.size )
+    for exit in exits:
+        dist[exit] = 0
+    q = deque(exits)
+    walk = puzzle.slidesInto
+    if instrument.enabled:
+        walk = instrument.countingSlidesInto( puzzle.slidesInto )
+
+    # With one exit, every path ends at it
+    if len( exits ) == 1:
+        via = None
+        while (q):
+            current = q.popleft()
+            moves = dist[current] + 1
+            for direction in DIRECTIONS:
+                for n in walk( current, direction ):
+                    if dist[n] == -1:
+                        dist[n] = moves
+                        next[n] = current
+                        q.append(n)
+    else:
+        via = array( 'l', [-1] ) * puzzle.size
+        for exit in exits:
+            via[exit] = exit
+        while (q):
+            current = q.popleft()
+            moves = dist[current] + 1
+            for direction in DIRECTIONS:
+                for n in walk( current, direction ):
+                    if dist[n] == -1:
+                        dist[n] = moves
+                        next[n] = current
+                        via[n] = via[current]
+                        q.append(n)
+
+    if instrument.enabled:
+        instrument.countLayers( dist )
+    return PathTree( puzzle, dist, next, via )
+
+class PathDag(PathTree):
+    """
+    This class is the graph of every shortest path of a whole
+    compact puzzle, as found by solveDag. Besides the arrays of
+    a PathTree, every position has the set of its moves that
+    start a shortest path, as one bit per direction of
+    DIRECTIONS, and the number of different shortest paths it
+    has. The first move of the tree is the first of DIRECTIONS
+    that starts a shortest path, so path gives the same
+    canonical path whatever order the search went in.
+    """
+
+    __slots__ = 'moves', 'counts'
+
+    def __init__( self, puzzle, dist, next, via, moves, counts ):
+        """
+        The initialization method.
+        :param puzzle: the CompactPuzzle that was solved
+        :param dist: the moves needed from every cell, -1 if none
+        :param next: the cell reached by the canonical first move
+                     from every cell, -1 if none
+        :param via: the exit of the canonical path of every cell,
+                    or None if the puzzle has only the one exit
+        :param moves: a bytearray of the bits of the directions
+                      that start a shortest path from every cell
+        :param counts: the number of shortest paths from every cell
+        :return: None
+        """
+        PathTree.__init__( self, puzzle, dist, next, via )
+        self.moves = moves
+        self.counts = counts
+
+    def pathCount( self, cell ):
+        """
+        This method returns the number of different shortest
+        paths, as sequences of moves, from a position.
+        :param cell: The id of the position
+        :return: The number of paths, 0 if there is none
+        """
+        return self.counts[cell]
+
+    def optimalMoves( self, cell ):
+        """
+        This method returns the moves that start a shortest path.
+        :param cell: The id of the position
+        :return: A list of directions, in the order of DIRECTIONS
+        """
+        bits = self.moves[cell]
+        return [ direction for bit, direction in enumerate( DIRECTIONS )
+                 if bits & ( 1 << bit ) ]
+
+def solveDag( puzzle ):
+    """
+    This function is solveCompact that also keeps every
+    shortest path. The reverse search goes one layer of moves
+    at a time, so when a position is reached from another one
+    with one move fewer, that position's count is final. Every
+    such move is recorded as a bit, and the counts of the
+    positions it reaches are added up, so the graph and the
+    counts cost no more than the search itself.
+    :param puzzle: the CompactPuzzle to solve
+    :return: The PathDag of the puzzle
+    """
+
+    dist = array( 'l', [-1] ) * puzzle.size
+    next = array( 'l', [-1] ) * puzzle.size
+    moves = bytearray( puzzle.size )
+    counts = [0] * puzzle.size
+    via = None
+    if len( puzzle.exits ) > 1:
+        via = array( 'l', [-1] ) * puzzle.size
+    exits = range( puzzle.exit, puzzle.size )
+    for exit in exits:
+        dist[exit] = 0
+        counts[exit] = 1
+        if via != None:
+            via[exit] = exit
+    q = deque(exits)
+    walk = puzzle.slidesInto
+    if instrument.enabled:
+        walk = instrument.countingSlidesInto( puzzle.slidesInto )
+
+    while (q):
+        current = q.popleft()
+        reached = dist[current] + 1
+        for bit, direction in enumerate( DIRECTIONS ):
+            flag = 1 << bit
+            for n in walk( current, direction ):
+                if dist[n] == -1:
+                    dist[n] = reached
+                    q.append(n)
+                elif dist[n] != reached:
+                    continue
+
+                # The canonical first move is the lowest bit
+                if moves[n] == 0 or flag < moves[n] & -moves[n]:
+                    next[n] = current
+                    if via != None:
+                        via[n] = via[current]
+                moves[n] |= flag
+                counts[n] += counts[current]
+
+    if instrument.enabled:
+        instrument.countLayers( dist )
+    return PathDag( puzzle, dist, next, via, moves, counts )
+
+def solveLayers( puzzle ):
+    """
+    This generator is solveCompact one layer of moves at a
+    time. Each layer is handed out as soon as it is found, so
+    the positions one move from the exit can be written while
+    the rest of the pond is still being searched. The open
+    positions with no path come last, down each column in turn,
+    once the search is over.
+    :param puzzle: the CompactPuzzle to solve
+    :return: A generator of ( moves, cells ) pairs, where cells
+             is an array of the ids of the positions that need
+             that many moves, in ascending order of moves and
+             ending with the pair for 0, no path, even if empty
+    """
+    dist = array( 'l', [-1] ) * puzzle.size
+    layer = array( 'l', range( puzzle.exit, puzzle.size ) )
+    for exit in layer:
+        dist[exit] = 0
+    walk = puzzle.slidesInto
+
+    moves = 0
+    while len( layer ) > 0:
+        moves += 1
+        reached = array( 'l' )
+        for current in layer:
+            for direction in DIRECTIONS:
+                for n in walk( current, direction ):
+                    if dist[n] == -1:
+                        dist[n] = moves
+                        reached.append( n )
+        if len( reached ) > 0:
+            yield moves, reached
+        layer = reached
+
+    rocks = puzzle.rocks
+    width = puzzle.width
+    unreached = array( 'l' )
+    for column in range( width ):
+        for cell in range( column, puzzle.exit, width ):
+            if dist[cell] == -1 and not rocks[cell]:
+                unreached.append( cell )
+    yield 0, unreached
+
+def solveCells( puzzle ):
+    """
+    This generator is solveLayers one position at a time.
+    :param puzzle: the CompactPuzzle to solve
+    :return: A generator of ( cell, moves ) pairs for every open
+             position, in the order of solveLayers, with moves
+             -1 for the positions with no path
+    """
+    for moves, cells in solveLayers( puzzle ):
+        if moves == 0:
+            moves = -1
+        for cell in cells:
+            yield cell, moves
+
+def streamingSpots( testFileName ):
+    """
+    This generator is testingSpots for one layer of moves at a
+    time, solved with solveLayers.
+    :param testFileName: the name of the test file from
+                         which the puzzle shall be built
+    :return: A generator of ( moves, spots ) pairs, spots being
+             the positions as in testingSpots and moves 0 for
+             the positions with no path, which come last
+    """
+    puzzle = pond.readCompact( testFileName )
+    label = results.Results( puzzle, None ).label
+    for moves, cells in solveLayers( puzzle ):
+        yield moves, [ label( cell ) for cell in cells ]
+
+def stepsFromDistances( dist, puzzle ):
+    """
+    This function groups the positions of a compact puzzle
+    by the number of moves they need, in the same order and
+    format as testingSpots.
+    :param dist: the moves needed from every cell, -1 if none
+    :param puzzle: the CompactPuzzle the distances belong to
+    :return: The dictionary described in testingSpots
+    """
+    return results.Results( puzzle, dist ).steps()
+
+def testingSpots( testFileName, mode='reverse', compact=False, cache=None ):
     """
     This function builds a frozen pond puzzle and finds
     the shortest paths for every point on the pond, if
-    they exist.
+    they exist. See testingResults for the arguments.
     :param testFileName: the name of the test file from
                          which the puzzle shall be built
+    :param mode: 'reverse', 'reference', 'numpy', 'stops' or 'parallel'
+    :param compact: whether to use the compact representation
+    :param cache: an optional cache.ResultCache
     :return: A dictionary containing the points on the
              frozen pond for which there is a path to
              the exit, and a special list for points
              with no path
     """
+    return testingResults( testFileName, mode, compact, cache ).steps()
+
+def testingResults( testFileName, mode='reverse', compact=False, cache=None ):
+    """
+    This function builds a frozen pond puzzle and finds
+    the number of moves from every point on the pond, as
+    a results.Results that only names the points when it
+    is written out.
+
+    By default the whole pond is solved at once by searching
+    backwards from the exit ( see solveAll ). The 'reference'
+    mode instead runs findDJI from every point, which is far
+    slower but useful for cross-checking the results. The
+    'numpy' mode solves with the npsolve module, or with the
+    compact reverse search if NumPy is not installed, and the
+    'stops' mode solves on the smaller graph of the positions
+    where a slide can stop ( see compress.py ). The 'parallel'
+    mode spreads the compact reverse search over a process per
+    processor ( see parallel.py ).
+
+    With compact set, the puzzle is read straight into a
+    pond.CompactPuzzle instead of a graph of nodes, which
+    uses far less memory.
+
+    Given a cache.ResultCache, a puzzle that has been solved
+    before, in any mode, is not solved again, and one that has
+    not is solved in the given mode. The 'reference' mode,
+    which is for cross-checking, never uses the cache.
+
+    :param testFileName: the name of the test file from
+                         which the puzzle shall be built
+    :param mode: 'reverse', 'reference', 'numpy', 'stops' or 'parallel'
+    :param compact: whether to use the compact representation
+    :param cache: an optional cache.ResultCache
+    :return: A results.Results
+    """
+
+    if mode not in ('reverse', 'reference', 'numpy', 'stops', 'parallel'):
+        raise ValueError( "Unknown mode: " + str(mode) )
+
+    compact = compactMode( testFileName, mode, compact )
+    if cache != None and mode != 'reference':
+        with instrument.phase( 'readTest' ):
+            puzzle = pond.readCompact( testFileName )
+        with instrument.phase( 'solve' ):
+            dist, source = cache.solve( puzzle, modeSolver( testFileName, mode, compact ) )
+            return results.Results( puzzle, dist )
+
+    return solveResults( testFileName, mode, compact )
+
+def compactMode( testFileName, mode='reverse', compact=False ):
+    """
+    This function checks whether a puzzle file can only be read
+    by pond.readCompact, as binary ponds and ponds with more than
+    one exit can, and if so solves it with the compact puzzle.
+    It is checked before the cache is, so that whether a puzzle
+    can be solved in a mode does not depend on what is cached.
+    The numpy and stops modes, which only read text ponds with
+    one exit, raise a ValueError for such a puzzle.
+    :param testFileName: the name of the puzzle file
+    :param mode: the mode, see testingResults
+    :param compact: whether the compact representation was asked for
+    :return: Whether to use the compact representation
+    """
+    if compact and mode not in ('numpy', 'stops'):
+        return compact
 
-    # The dictionary that stores the successful and
-    # unsuccessful points. The keys correspond to the
-    # length of a given positions shortest path, while
-    # values are lists containing the positions. Note,
-    # positions for which there is no path are stored at key 0.
-    steps = {}
+    import binary
+    if binary.isBinaryPond( testFileName ):
+        kind = "Binary ponds"
+    else:
+        with open( testFileName, 'rb' ) as file:
+            if len( file.readline().split() ) <= 3:
+                return compact
+        kind = "Ponds with more than one exit"
+    if mode in ('numpy', 'stops'):
+        raise ValueError( kind + " are not solved in the " + mode +
+                          " mode, use reverse, reference or parallel" )
+    return True
+
+def modeSolver( testFileName, mode='reverse', compact=False ):
+    """
+    This function gives the solve of a mode as a function of
+    the puzzle, for cache.ResultCache.solve to call on a miss.
+    :param testFileName: the name of the puzzle file
+    :param mode: the mode, see testingResults
+    :param compact: whether to use the compact representation
+    :return: A function from a pond.CompactPuzzle read from the
+             file to the moves needed from every cell
+    """
+    return lambda puzzle: solveResults( testFileName, mode, compact, puzzle ).dist
+
+def solveResults( testFileName, mode='reverse', compact=False, puzzle=None ):
+    """
+    This function is testingResults without the cache.
+    :param testFileName: the name of the puzzle file
+    :param mode: the mode, see testingResults
+    :param compact: whether to use the compact representation
+    :param puzzle: the file already read by pond.readCompact,
+                   or None
+    :return: A results.Results
+    """
+
+    compact = compactMode( testFileName, mode, compact )
+    if mode == 'numpy':
+        import npsolve
+        if npsolve.HAVE_NUMPY:
+            with instrument.phase( 'solve' ):
+                puzzle, dist = npsolve.solveFile( testFileName )
+                return results.Results( puzzle, dist )
+        mode = 'reverse'
+        compact = True
+    if mode == 'parallel':
+        compact = True
+
+    if compact:
+        if puzzle == None:
+            with instrument.phase( 'readTest' ):
+                puzzle = pond.readCompact( testFileName )
+        with instrument.phase( 'solve' ):
+            return results.Results( puzzle, compactDistances( puzzle, mode ) )
 
     # Get the different properties of the puzzle and
     # the puzzle's layout from the given text file
-    height, width, escape, text = readTest( testFileName )
+    with instrument.phase( 'readTest' ):
+        height, width, escape, text = readTest( testFileName )
 
     # Represent the puzzle as a graph made of nodes
-    puzzle = buildPuzzle(text, width, height, escape)
+    with instrument.phase( 'buildPuzzle' ):
+        puzzle = buildPuzzle(text, width, height, escape)
+        rocks = pond.fromText( text, width, height, escape )
+
+    with instrument.phase( 'solve' ):
+        dist = distancesFromPuzzle( puzzle, rocks, width, height, escape, mode )
+        return results.Results( rocks, dist )
+
+def distancesFromPuzzle( puzzle, rocks, width, height, escape, mode ):
+    """
+    This function is the solving half of testingResults, once
+    the puzzle has been read and built.
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param rocks: the same puzzle as a pond.CompactPuzzle
+    :param width: the width of the puzzle
+    :param height: the height of the puzzle
+    :param escape: the row where the escape node is located
+    :param mode: 'reverse', 'reference' or 'stops'
+    :return: The moves needed from every cell, -1 if none
+    """
+
+    # The number of moves from every position, by cell id
+    dist = array( 'l', [-1] ) * ( rocks.exit + 1 )
+    dist[rocks.exit] = 0
+
+    # Solve every position at once, or precompute the
+    # slides shared by the per-position searches
+    if mode == 'reverse':
+        solved = solveAll( puzzle, width, escape )
+    elif mode == 'stops':
+        import compress
+        solved = compress.solveCompressed( puzzle, width, height, escape )
+        mode = 'reverse'
+    else:
+        tables = buildSlideTables( puzzle, width, height )
+
+        # Positions that cannot reach the exit at all are
+        # found up front and never searched from
+        import reach
+        index = reach.buildIndex( rocks )
 
     # Loop over every spot in the puzzle
-    for column in range( width ):
-        for row in range( height ):
+    for row in range( height ):
+        for column in range( width ):
 
             # If the position is not a rock
             if puzzle[row][column] != None:
 
                 startVert = puzzle[row][column]
-                endVert = puzzle[escape][width]
-                path = findDJI(startVert,endVert)
-
-                # If there was a path to the end,
-                # add the position to one of the
-                # successful lists
-                if path != None:
-
-                    # If the length of this path has not been
-                    # encountered so far
-                    if steps.get(len(path)-1) != None:
-                        steps[ len(path)-1 ].append( "(" + str(column) + ", " + str(row) + ")" )
-                    else:
-                        steps[len(path)-1] = list()
-                        steps[len(path)-1].append( "(" + str(column) + ", " + str(row) + ")" )
-
-                # If there was no path
+                cell = row * width + column
+
+                if mode == 'reverse':
+                    moves = solved.get( startVert )
+                elif not index.reachable( cell ):
+                    moves = None
                 else:
-                    if steps.get(0) != None:
-                        steps[0].append( "(" + str(column) + ", " + str(row) + ")" )
-                    else:
-                        steps[0] = list()
-                        steps[0].append( "(" + str(column) + ", " + str(row) + ")" )
-    return steps
+                    endVert = puzzle[escape][width]
+                    moves = findDistance(startVert,endVert,tables)
+
+                if moves != None:
+                    dist[cell] = moves
+    return dist
+
+def compactDistances( puzzle, mode='reverse' ):
+    """
+    This function is testingResults for a pond.CompactPuzzle.
+    findDJI runs on the compact puzzle by handing it to findDJI
+    in place of the slide tables, with cell ids as the nodes.
+    :param puzzle: the CompactPuzzle to solve
+    :param mode: 'reverse', 'reference' or 'parallel'
+    :return: The moves needed from every cell, -1 if none
+    """
+
+    if mode == 'reverse':
+        return solveCompact( puzzle ).dist
+    if mode == 'parallel':
+        import parallel
+        return parallel.solveParallel( puzzle ).dist
+    if mode != 'reference':
+        raise ValueError( "Mode " + str(mode) + " does not support compact puzzles" )
+    if len( puzzle.exits ) > 1:
+        raise ValueError( "The reference mode only solves puzzles with one exit" )
+
+    # Cell ids are dense integers, so the searches can use
+    # the index addressed heap. Positions that cannot reach
+    # the exit are never searched from.
+    import reach
+    puzzle.buildStops()
+    index = reach.buildIndex( puzzle )
+    queue = lambda: heap.IndexHeap( puzzle.exit + 1 )
+    dist = array( 'l', [-1] ) * ( puzzle.exit + 1 )
+    dist[puzzle.exit] = 0
+    for cell in range( puzzle.exit ):
+        if index.reachable( cell ):
+            moves = findDistance( cell, puzzle.exit, puzzle, queue )
+            if moves != None:
+                dist[cell] = moves
+    return dist
 
 def printResults( paths ):
     """
@@ -356,42 +1113,147 @@ def printResults( paths ):
     else:
         print( "No starting square." )
 
-def main():
+def parseArguments( arguments=None ):
     """
-    The main function. It builds and tests three different
-    forzen pond puzzles.
-    :return: None
+    This function reads the command line.
+    :param arguments: the arguments, or None for sys.argv
+    :return: The parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Solve frozen pond puzzles. With no puzzles, "
+                    "the five bundled tests are solved." )
+    parser.add_argument( 'puzzles', nargs='*',
+                         help="puzzle files, directories or glob patterns" )
+    parser.add_argument( '--workers', type=int, default=None,
+                         help="number of worker processes ( default: one per processor, "
+                              "and one with --mode parallel, whose solves use them all )" )
+    parser.add_argument( '--json', action='store_true',
+                         help="print one line of JSON per puzzle" )
+    parser.add_argument( '--format', default='text', choices=('text', 'csv', 'jsonl'),
+                         help="how to write the positions of each puzzle, see results.py" )
+    parser.add_argument( '--stream', action='store_true',
+                         help="print each layer of moves as soon as it is solved, "
+                              "one puzzle at a time, see solveLayers" )
+    parser.add_argument( '--mode', default='reverse',
+                         choices=('reverse', 'reference', 'numpy', 'stops', 'parallel'),
+                         help="how to solve each puzzle, see testingSpots" )
+    parser.add_argument( '--compact', action='store_true',
+                         help="use the compact puzzle representation" )
+    parser.add_argument( '--no-cache', dest='cache', action='store_false',
+                         help="solve every puzzle again instead of using the result cache" )
+    parser.add_argument( '--cache-dir', default=None,
+                         help="where the result cache keeps solved puzzles" )
+    parser.add_argument( '--report', choices=('text', 'json'), default=None,
+                         help="time and count the work of each solve, see instrument.py" )
+    parser.add_argument( '--profile', default=None, metavar='DIRECTORY',
+                         help="run each solve under cProfile and dump the statistics here" )
+    parser.add_argument( '--serve', action='store_true',
+                         help="load the puzzles and answer queries, see server.py" )
+    parser.add_argument( '--host', default='127.0.0.1',
+                         help="address to serve on ( default: 127.0.0.1 )" )
+    parser.add_argument( '--port', type=int, default=8765,
+                         help="TCP port to serve on ( default: 8765 )" )
+    parser.add_argument( '--socket', default=None,
+                         help="Unix socket to serve on instead of TCP" )
+    return parser.parse_args( arguments )
+
+def solveBatch( options ):
+    """
+    This function solves the puzzles named on the command line
+    in parallel and prints each result as it finishes.
+    :param options: the parsed command line
+    :return: The number of puzzles that failed
+    """
+    import batch
+
+    fileNames = batch.findPuzzles( options.puzzles )
+    if options.stream:
+        start = time.perf_counter()
+        failed = sum( 1 for fileName in fileNames
+                      if batch.streamPuzzle( fileName, options.format ) != None )
+        print( "Solved " + str( len( fileNames ) - failed ) + " of " +
+               str( len( fileNames ) ) + " puzzles in %.3f s" % ( time.perf_counter() - start ),
+               file=sys.stderr )
+        return failed
+
+    cacheDirectory = None
+    if options.cache:
+        import cache
+        cacheDirectory = options.cache_dir or cache.DEFAULT_DIRECTORY
+
+    failed = 0
+    sources = { 'memory': 0, 'disk': 0, 'miss': 0 }
+    start = time.perf_counter()
+    for result in batch.runBatch( fileNames, options.workers,
+                                  options.mode, options.compact, cacheDirectory,
+                                  options.report != None, options.profile ):
+        output = time.perf_counter()
+        batch.printResult( result, options.json, options.format )
+        if options.report != None:
+            batch.printReport( result['file'], result['report'],
+                               time.perf_counter() - output, options.report == 'json' )
+        if 'error' in result:
+            failed += 1
+        if result.get( 'cache' ) in sources:
+            sources[result['cache']] += 1
+
+    print( "Solved " + str( len( fileNames ) - failed ) + " of " +
+           str( len( fileNames ) ) + " puzzles in %.3f s" % ( time.perf_counter() - start ),
+           file=sys.stderr )
+    if cacheDirectory != None:
+        print( "Cache: " + str( sources['memory'] ) + " memory hits, " +
+               str( sources['disk'] ) + " disk hits, " +
+               str( sources['miss'] ) + " misses", file=sys.stderr )
+    return failed
+
+def main( arguments=None ):
+    """
+    The main function. It solves the puzzles named on the
+    command line, or else builds and tests the five bundled
+    frozen pond puzzles.
+    :param arguments: the command line arguments, or None
+                      for sys.argv
+    :return: The exit status
     """
 
-    # Test number 1
-    firstTest = 'test1'
-    paths1 = testingSpots( firstTest )
-    print( "\n" + "Test 1: ")
-    printResults( paths1 )
-
-    # Test number 2
-    secondTest = 'test2'
-    paths2 = testingSpots( secondTest )
-    print( "\n" + "Test 2: ")
-    printResults( paths2 )
-
-    # Test number 3
-    thirdTest = 'test3'
-    paths3 = testingSpots( thirdTest )
-    print( "\n" + "Test 3: ")
-    printResults( paths3 )
-
-    # Test number 4
-    fourthTest = 'test4.txt'
-    paths4 = testingSpots( fourthTest )
-    print( "\n" + "Test 4: ")
-    printResults( paths4 )
-
-    # Test number 5
-    fifthTest = 'test5.txt'
-    paths5 = testingSpots( fifthTest )
-    print( "\n" + "Test 5: ")
-    printResults( paths5 )
+    options = parseArguments( arguments )
+    if options.serve:
+        import batch
+        import server
+        server.serve( batch.findPuzzles( options.puzzles ), options.host,
+                      options.port, options.socket, options.workers )
+        return 0
+    if options.puzzles:
+        return 1 if solveBatch( options ) else 0
+
+    # The bundled tests, and what to call them
+    tests = ( ( 'test1', "Test 1: " ), ( 'test2', "Test 2: " ),
+              ( 'test3', "Test 3: " ), ( 'test4.txt', "Test 4: " ),
+              ( 'test5.txt', "Test 5: " ) )
+
+    for testName, title in tests:
+        if options.report != None:
+            instrument.enable()
+        if options.profile != None:
+            paths = instrument.profiled( options.profile, testName, testingSpots,
+                                         testName, options.mode, options.compact )
+        else:
+            paths = testingSpots( testName, options.mode, options.compact )
+
+        with instrument.phase( 'output' ):
+            print( "\n" + title)
+            printResults( paths )
+
+        if options.report != None:
+            recorded = instrument.snapshot()
+            recorded['file'] = testName
+            if options.report == 'json':
+                print( instrument.report( recorded, True ), file=sys.stderr )
+            else:
+                print( "Report for " + testName + ":\n" + instrument.report( recorded ),
+                       file=sys.stderr )
+            instrument.disable()
+    return 0
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit( main() )
@@ -11,6 +11,8 @@ Authors:  (11/16/2016) Adam Purtee @ RIT CS
 """
 __author__ = 'Amit Maller', 'Kyle McGlynn'
 
+from array import array
+
 class Heap(object):
     '''
     Heap that orders by a given comparison function, default to less-than.
@@ -141,6 +143,7 @@ class Heap(object):
         if self.size > 0:
             self.data[0] = self.data.pop(self.size)   # PYTHON LIST POP NOT HEAP POP
             self.keys[0] = self.keys.pop(self.size)
+            self.itemIndex[self.data[0]] = 0
             self.__bubbleDown(0)
         return retjob
 
@@ -158,6 +161,252 @@ class Heap(object):
             ret += str(self.data[item]) + " "
         return ret
 
+class BucketQueue(object):
+    '''
+    Monotone priority queue for small non-negative integer keys,
+    as used by Dial's version of Dijkstra's algorithm. Items are
+    kept in one bucket per key, so insert, pop and decreaseKey
+    are all O(1), plus one step per empty bucket skipped by pop.
+    It has the same interface as Heap, but keys may never be
+    smaller than the key of the last popped item.
+    '''
+    __slots__ = ('buckets','keys','current','size')
+
+    def __init__(self):
+        '''
+        Constructor. Takes no comparison function, since keys
+        are compared as integers.
+        '''
+        self.buckets = []     # buckets[key] holds the items with that key
+        self.keys = {}        # hashmap from items to keys
+        self.current = 0      # no bucket below this one holds items
+        self.size = 0         # the number of things in the queue
+
+    def insert(self, item, key=None):
+        '''
+        Inserts an item into the queue.
+        :param item: Item to be inserted
+        :param key:  The key for the item.  Defaults to the item if not given.
+        '''
+        if key is None:
+            key = item
+        if key < self.current:
+            raise ValueError("key " + str(key) + " is below the last popped key")
+
+        while len(self.buckets) <= key:
+            self.buckets.append({})
+        self.buckets[key][item] = None
+        self.keys[item] = key
+        self.size += 1
+
+    def decreaseKey(self, item, newkey):
+        """
+        Assumes item in queue!  Will break if not!
+        Moves the item to the bucket of its new key.
+        :param item:  item in queue to have it's key decreased
+        :param newKey:  the new value of the key.
+        """
+        del self.buckets[self.keys[item]][item]
+        self.size -= 1
+        self.insert(item, newkey)
+
+    def pop(self):
+        '''
+        Removes and returns an item with the smallest key
+        :return: Item with the smallest key
+        '''
+        while not self.buckets[self.current]:
+            self.current += 1
+        item = self.buckets[self.current].popitem()[0]
+        del self.keys[item]
+        self.size -= 1
+        return item
+
+    def __len__(self):
+        '''
+        :return: size of queue
+        '''
+        return self.size
+
+    def __str__(self):
+        ret = ""
+        for bucket in self.buckets[self.current:]:
+            for item in bucket:
+                ret += str(item) + " "
+        return ret
+
+class IndexHeap(object):
+    '''
+    d-ary min heap whose items are dense integer ids, such as the
+    cell ids of a pond.CompactPuzzle. Keys are compared directly
+    as numbers, and the position of every item in the heap is kept
+    in a preallocated array indexed by id instead of a hashmap.
+    It has the same interface as Heap for integer items.
+    '''
+    __slots__ = ('items','keys','position','arity','size')
+
+    def __init__(self, capacity, arity=4):
+        '''
+        Constructor.
+        :param capacity: Items must be integers in range(capacity)
+        :param arity: The number of children of each heap node
+        '''
+        self.items = array('l', [0]) * capacity     # the array
+        self.keys = [0] * capacity                  # parallel array for keys
+        self.position = array('l', [-1]) * capacity # slot of each item, -1 if absent
+        self.arity = arity
+        self.size = 0
+
+    def __siftUp(self, loc, item, key):
+        '''
+        Places the item with the given key at loc or above, moving
+        larger parents down into the hole as it goes.
+        :param loc: Place to start from
+        :param item: Item being placed
+        :param key: Key of the item
+        '''
+        items, keys, position, arity = self.items, self.keys, self.position, self.arity
+        while loc > 0:
+            parent = (loc-1)//arity
+            if keys[parent] <= key:
+                break
+            items[loc] = items[parent]
+            keys[loc] = keys[parent]
+            position[items[loc]] = loc
+            loc = parent
+        items[loc] = item
+        keys[loc] = key
+        position[item] = loc
+
+    def __siftDown(self, loc, item, key):
+        '''
+        Places the item with the given key at loc or below, moving
+        the smallest child up into the hole as it goes.
+        :param loc: Place to start from
+        :param item: Item being placed
+        :param key: Key of the item
+        '''
+        items, keys, position, arity = self.items, self.keys, self.position, self.arity
+        size = self.size
+        while True:
+            first = loc*arity + 1
+            if first >= size:
+                break
+            child = first
+            childKey = keys[first]
+            for other in range(first+1, min(first+arity, size)):
+                if keys[other] < childKey:
+                    child = other
+                    childKey = keys[other]
+            if key <= childKey:
+                break
+            items[loc] = items[child]
+            keys[loc] = childKey
+            position[items[loc]] = loc
+            loc = child
+        items[loc] = item
+        keys[loc] = key
+        position[item] = loc
+
+    def __contains__(self, item):
+        return self.position[item] != -1
+
+    def insert(self, item, key=None):
+        '''
+        Inserts an item into the heap.
+        :param item: Item to be inserted
+        :param key:  The key for the item.  Defaults to the item if not given.
+        '''
+        if key is None:
+            key = item
+        self.size += 1
+        self.__siftUp(self.size-1, item, key)
+
+    def decreaseKey(self, item, newkey):
+        """
+        Assumes item in heap!
+        :param item:  item in heap to have it's key decreased
+        :param newKey:  the new value of the key.
+        """
+        self.__siftUp(self.position[item], item, newkey)
+
+    def insertOrDecrease(self, item, key):
+        """
+        Inserts an item, or lowers its key if it is already in
+        the heap with a larger key.
+        :param item:  item to insert or update
+        :param key:  the new key of the item
+        :return: True if the heap changed
+        """
+        loc = self.position[item]
+        if loc == -1:
+            self.insert(item, key)
+            return True
+        if key < self.keys[loc]:
+            self.__siftUp(loc, item, key)
+            return True
+        return False
+
+    def pop(self):
+        '''
+        Removes and returns top of the heap
+        :return: Item on top of the heap
+        '''
+        top = self.items[0]
+        self.position[top] = -1
+        self.size -= 1
+        if self.size > 0:
+            self.__siftDown(0, self.items[self.size], self.keys[self.size])
+        return top
+
+    def pushPop(self, item, key=None):
+        '''
+        Inserts an item and then pops the top of the heap, faster
+        than doing the two separately. Assumes item not in heap.
+        :param item: Item to be inserted
+        :param key:  The key for the item.  Defaults to the item if not given.
+        :return: Item on top of the heap, which may be the new item
+        '''
+        if key is None:
+            key = item
+        if self.size == 0 or key <= self.keys[0]:
+            return item
+        top = self.items[0]
+        self.position[top] = -1
+        self.__siftDown(0, item, key)
+        return top
+
+    def heapify(self, items, keys=None):
+        '''
+        Replaces the contents of the heap with the given items in
+        O(n) time.
+        :param items: The items, distinct integers
+        :param keys: The keys of the items.  Defaults to the items.
+        '''
+        if keys is None:
+            keys = items
+        for loc in range(self.size):
+            self.position[self.items[loc]] = -1
+        self.size = len(items)
+        for loc in range(self.size):
+            self.items[loc] = items[loc]
+            self.keys[loc] = keys[loc]
+            self.position[items[loc]] = loc
+        for loc in range((self.size-2)//self.arity, -1, -1):
+            self.__siftDown(loc, self.items[loc], self.keys[loc])
+
+    def __len__(self):
+        '''
+        :return: size of heap
+        '''
+        return self.size
+
+    def __str__(self):
+        ret = ""
+        for loc in range(self.size):
+            ret += str(self.items[loc]) + " "
+        return ret
+
 def namecmp(n1, n2):
     '''
     Simple comparison function as an example.
@@ -236,5 +485,29 @@ def main():
     while h:
         print("popped " + str(h.pop()))
 
+    print("\nBucket queue")
+    b = BucketQueue()
+    for item, key in [("a", 10), ("b", 5), ("c", 200)]:
+        print("insert " +str((item, key)))
+        b.insert(item, key)
+    print("decrease key for c to 2")
+    b.decreaseKey("c", 2)
+    while b:
+        print("popped " + str(b.pop()))
+
+    print("\n4-ary index heap of ids 0 to 9")
+    ih = IndexHeap(10)
+    ih.heapify([3, 1, 4, 5, 9, 2, 6], [30, 10, 40, 50, 90, 20, 60])
+    print("heapified 3, 1, 4, 5, 9, 2, 6 with keys ten times the ids")
+    print("decrease key for 9 to 15")
+    ih.decreaseKey(9, 15)
+    print("insert or decrease 0 to 5, then 4 to 45 ( no change )")
+    ih.insertOrDecrease(0, 5)
+    ih.insertOrDecrease(4, 45)
+    print("push 7 with key 1 and pop: " + str(ih.pushPop(7, 1)))
+    print("push 8 with key 25 and pop: " + str(ih.pushPop(8, 25)))
+    while ih:
+        print("popped " + str(ih.pop()))
+
 if __name__ == '__main__':
     main()
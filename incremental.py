@@ -0,0 +1,248 @@
+"""
+This module keeps the solution of a frozen pond puzzle up
+to date while rocks are added and removed. A new or removed
+rock only changes the slides along its own row and column,
+so the slide tables are patched along those two lanes, and
+the number of moves is repaired only for the positions whose
+shortest paths went through a changed slide, or that can now
+do better through one.
+
+The repair is done in two phases. First, positions that lost
+every move to a position one step closer to the exit are
+invalidated, and the loss is passed on to whatever slid into
+them. Then the invalidated positions, and those with new
+slides, are settled again with Dijkstra's algorithm, starting
+from the distances that are still known to be right.
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+from collections import deque
+
+import escape
+import heap
+
+class MutablePuzzle(object):
+    """
+    This class is a pond.CompactPuzzle together with its
+    slide tables and solution, all kept up to date as
+    rocks are added and removed.
+    """
+
+    __slots__ = 'puzzle', 'tree'
+
+    def __init__( self, puzzle ):
+        """
+        The initialization method. Solves the puzzle once.
+        :param puzzle: the CompactPuzzle to edit. It is changed
+                       in place by addRock and removeRock.
+        :return: None
+        """
+        if len( puzzle.exits ) > 1:
+            raise ValueError( "Only puzzles with one exit can be edited" )
+        self.puzzle = puzzle
+        puzzle.buildStops()
+        self.tree = escape.solveCompact( puzzle )
+
+    def distance( self, row, column ):
+        """
+        This method returns the number of moves from a position.
+        :param row: The row of the position
+        :param column: The column of the position
+        :return: The number of moves, or -1 if there is no path
+        """
+        return self.tree.distance( self.puzzle.cell( row, column ) )
+
+    def path( self, row, column ):
+        """
+        This method returns a shortest path from a position.
+        :param row: The row of the position
+        :param column: The column of the position
+        :return: A generator of the cell ids of the path, see
+                 escape.PathTree.path
+        """
+        return self.tree.path( self.puzzle.cell( row, column ) )
+
+    def lane( self, cell, step, edge ):
+        """
+        This method collects the open positions next to a cell
+        along one direction, stopping at a rock or the edge.
+        :param cell: the id of the cell to start beside
+        :param step: the change in cell id per position
+        :param edge: the id of the position on the edge of the
+                     pond in that direction
+        :return: A list of cell ids, nearest first
+        """
+        rocks = self.puzzle.rocks
+        cells = []
+        while cell != edge and not rocks[cell + step]:
+            cell += step
+            cells.append( cell )
+        return cells
+
+    def lanes( self, cell ):
+        """
+        This method finds the open positions beside a cell in
+        its row and column, up to the nearest rock or edge.
+        :param cell: the id of the cell
+        :return: Lists of the ids to the left, right, above and
+                 below the cell, nearest first
+        """
+        width = self.puzzle.width
+        row, column = divmod( cell, width )
+        lastRow = ( self.puzzle.height - 1 ) * width + column
+        return ( self.lane( cell, -1, row * width ),
+                 self.lane( cell, 1, row * width + width - 1 ),
+                 self.lane( cell, -width, column ),
+                 self.lane( cell, width, lastRow ) )
+
+    def addRock( self, row, column ):
+        """
+        This method puts a rock on an open position.
+        :param row: The row of the position
+        :param column: The column of the position
+        :return: A list of the ids of the cells whose number of
+                 moves changed
+        """
+        puzzle = self.puzzle
+        cell = puzzle.cell( row, column )
+        if puzzle.rocks[cell]:
+            return []
+
+        stops = puzzle.stops
+        left, right, up, down = self.lanes( cell )
+        puzzle.rocks[cell] = 1
+        for direction in escape.DIRECTIONS:
+            stops[direction][cell] = -1
+
+        # The lanes on either side now stop short of the rock
+        for n in left:
+            stops['right'][n] = cell - 1
+        for n in right:
+            stops['left'][n] = cell + 1
+        for n in up:
+            stops['down'][n] = cell - puzzle.width
+        for n in down:
+            stops['up'][n] = cell + puzzle.width
+
+        before = { cell: self.tree.dist[cell] }
+        self.tree.dist[cell] = -1
+        self.tree.next[cell] = -1
+        return self.repair( left + right + up + down, before )
+
+    def removeRock( self, row, column ):
+        """
+        This method takes the rock off a position.
+        :param row: The row of the position
+        :param column: The column of the position
+        :return: A list of the ids of the cells whose number of
+                 moves changed
+        """
+        puzzle = self.puzzle
+        cell = puzzle.cell( row, column )
+        if not puzzle.rocks[cell]:
+            return []
+
+        stops = puzzle.stops
+        left, right, up, down = self.lanes( cell )
+        puzzle.rocks[cell] = 0
+
+        # The lanes on either side join up through the cell
+        rowLane = left + [cell] + right
+        columnLane = up + [cell] + down
+        leftEnd = left[-1] if left else cell
+        rightEnd = right[-1] if right else cell
+        if rightEnd % puzzle.width == puzzle.width - 1 and row == puzzle.escape:
+            rightEnd = puzzle.exit
+        for n in rowLane:
+            stops['left'][n] = leftEnd
+            stops['right'][n] = rightEnd
+        upEnd = up[-1] if up else cell
+        downEnd = down[-1] if down else cell
+        for n in columnLane:
+            stops['up'][n] = upEnd
+            stops['down'][n] = downEnd
+
+        return self.repair( rowLane + up + down, {} )
+
+    def repair( self, changed, before ):
+        """
+        This method brings the solution up to date after the
+        slides of some positions have changed.
+        :param changed: the ids of the positions whose slides changed
+        :param before: the old number of moves of any position
+                       already changed by the caller
+        :return: A list of the ids of the cells whose number of
+                 moves changed
+        """
+        puzzle = self.puzzle
+        stops = puzzle.stops
+        dist = self.tree.dist
+        next = self.tree.next
+
+        # Phase one: invalidate positions that can no longer
+        # make a move to a position one step closer to the exit
+        invalid = []
+        q = deque( changed )
+        while (q):
+            current = q.popleft()
+            moves = dist[current]
+            if moves == -1:
+                continue
+
+            for direction in escape.DIRECTIONS:
+                n = stops[direction][current]
+                if n != current and dist[n] == moves - 1:
+                    next[current] = n
+                    break
+            else:
+                if current not in before:
+                    before[current] = moves
+                dist[current] = -1
+                next[current] = -1
+                invalid.append( current )
+                for direction in escape.DIRECTIONS:
+                    for n in puzzle.slidesInto( current, direction ):
+                        if dist[n] == moves + 1:
+                            q.append(n)
+
+        # Phase two: settle the invalidated positions, and those
+        # with new slides, outwards from the distances still known
+        best = {}
+        via = {}
+        q = heap.Heap()
+        for current in invalid + changed:
+            for direction in escape.DIRECTIONS:
+                n = stops[direction][current]
+                if n == current or dist[n] == -1:
+                    continue
+                moves = dist[n] + 1
+                if ( dist[current] == -1 or moves < dist[current] ) and \
+                        moves < best.get( current, moves + 1 ):
+                    if current in best:
+                        q.decreaseKey( current, moves )
+                    else:
+                        q.insert( current, moves )
+                    best[current] = moves
+                    via[current] = n
+
+        while (q):
+            current = q.pop()
+            moves = best.pop( current )
+            if current not in before:
+                before[current] = dist[current]
+            dist[current] = moves
+            next[current] = via.pop( current )
+
+            for direction in escape.DIRECTIONS:
+                for n in puzzle.slidesInto( current, direction ):
+                    if ( dist[n] == -1 or moves + 1 < dist[n] ) and \
+                            moves + 1 < best.get( n, moves + 2 ):
+                        if n in best:
+                            q.decreaseKey( n, moves + 1 )
+                        else:
+                            q.insert( n, moves + 1 )
+                        best[n] = moves + 1
+                        via[n] = current
+
+        return [ cell for cell in before if dist[cell] != before[cell] ]
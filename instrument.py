@@ -0,0 +1,270 @@
+"""
+This module is an optional instrumentation layer for the
+solver. When enabled, it times the phases of a solve ( reading,
+building, solving and output ) and counts the work done inside
+it: heap operations, slide steps, positions expanded and the
+largest frontier.
+
+It is off by default and then costs close to nothing: the
+solvers check it once per search, not once per step, and only
+swap in the counting queue and slide wrappers below when it is
+on. From the command line it is turned on by --report, and
+--profile additionally runs each solve under cProfile:
+
+    python escape.py test1 test3 --report json --profile profiles/
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import cProfile
+import json
+import os
+import time
+
+# Whether the solvers should record anything
+enabled = False
+
+# Seconds spent in each phase, and the counters
+timers = {}
+counters = {}
+
+# The phases being timed, so that a phase inside another of the
+# same name is not timed twice
+running = set()
+
+def enable():
+    """
+    This function turns the instrumentation on and clears it.
+    :return: None
+    """
+    global enabled
+    enabled = True
+    reset()
+
+def disable():
+    """
+    This function turns the instrumentation off.
+    :return: None
+    """
+    global enabled
+    enabled = False
+
+def reset():
+    """
+    This function clears the timers and counters.
+    :return: None
+    """
+    timers.clear()
+    counters.clear()
+
+def count( name, amount=1 ):
+    """
+    This function adds to a counter.
+    :param name: the name of the counter
+    :param amount: how much to add
+    :return: None
+    """
+    counters[name] = counters.get( name, 0 ) + amount
+
+def largest( name, value ):
+    """
+    This function keeps the largest value seen for a counter.
+    :param name: the name of the counter
+    :param value: the value seen
+    :return: None
+    """
+    if value > counters.get( name, 0 ):
+        counters[name] = value
+
+class phase(object):
+    """
+    This class is a context manager that adds the time spent
+    inside it to the timer of a phase, when enabled. A phase
+    inside another of the same name is only timed once.
+    """
+
+    __slots__ = 'name', 'start'
+
+    def __init__( self, name ):
+        """
+        The initialization method.
+        :param name: the name of the phase
+        :return: None
+        """
+        self.name = name
+        self.start = None
+
+    def __enter__( self ):
+        if enabled and self.name not in running:
+            running.add( self.name )
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__( self, *exception ):
+        if self.start != None:
+            running.discard( self.name )
+            timers[self.name] = timers.get( self.name, 0.0 ) + \
+                time.perf_counter() - self.start
+        return False
+
+class CountingQueue(object):
+    """
+    This class wraps a priority queue from the heap module and
+    counts the operations on it.
+    """
+
+    __slots__ = 'queue'
+
+    def __init__( self, queue ):
+        """
+        The initialization method.
+        :param queue: the queue to wrap
+        :return: None
+        """
+        self.queue = queue
+
+    def insert( self, item, key=None ):
+        count( 'heap inserts' )
+        self.queue.insert( item, key )
+        largest( 'largest frontier', len( self.queue ) )
+
+    def pop( self ):
+        count( 'heap pops' )
+        return self.queue.pop()
+
+    def decreaseKey( self, item, newkey ):
+        count( 'heap decreaseKeys' )
+        self.queue.decreaseKey( item, newkey )
+
+    def __len__( self ):
+        return len( self.queue )
+
+def countingQueue( queue ):
+    """
+    This function wraps a queue class so that every queue it
+    makes counts its operations.
+    :param queue: the queue class, or any callable making a queue
+    :return: A callable making CountingQueues
+    """
+    return lambda: CountingQueue( queue() )
+
+class CountingSlides(object):
+    """
+    This class wraps the slides of a puzzle, such as
+    escape.SlideTables or a pond.CompactPuzzle, and counts
+    the slides and the positions slid over.
+    """
+
+    __slots__ = 'tables', 'function'
+
+    def __init__( self, tables, function ):
+        """
+        The initialization method.
+        :param tables: the slide tables handed to the function,
+                       or None
+        :param function: the function escape.slide
+        :return: None
+        """
+        self.tables = tables
+        self.function = function
+
+    def slide( self, start, direction ):
+        """
+        This method slides, and counts it.
+        :param start: The starting position
+        :param direction: The direction in which we are sliding
+        :return: The position where we stop sliding
+        """
+        end = self.function( start, direction, self.tables )
+        count( 'slides' )
+        if isinstance( start, int ):
+            startRow, startColumn = self.tables.position( start )
+            endRow, endColumn = self.tables.position( end )
+        else:
+            startRow, startColumn = start.row, start.column
+            endRow, endColumn = end.row, end.column
+        count( 'slide steps', abs( endRow - startRow ) + abs( endColumn - startColumn ) )
+        return end
+
+def countingSlidesInto( slidesInto ):
+    """
+    This function wraps a reversed slide function so that the
+    positions it walks over are counted as slide steps.
+    :param slidesInto: the function to wrap
+    :return: The counting function
+    """
+    def counted( *arguments ):
+        starts = slidesInto( *arguments )
+        count( 'slides' )
+        count( 'slide steps', len( starts ) )
+        return starts
+    return counted
+
+def countLayers( dist ):
+    """
+    This function records the size of the largest layer of a
+    breadth first search, which is its largest frontier.
+    :param dist: the number of moves of every position reached
+    :return: None
+    """
+    sizes = {}
+    for moves in dist:
+        if moves >= 0:
+            sizes[moves] = sizes.get( moves, 0 ) + 1
+    count( 'nodes expanded', sum( sizes.values() ) )
+    if sizes:
+        largest( 'largest frontier', max( sizes.values() ) )
+
+def snapshot():
+    """
+    This function returns a copy of what has been recorded.
+    :return: A dictionary of the timers and the counters
+    """
+    return { 'timers': dict( timers ), 'counters': dict( counters ) }
+
+def report( recorded=None, asJson=False ):
+    """
+    This function formats what has been recorded.
+    :param recorded: a snapshot, or None for the current one
+    :param asJson: whether to format it as JSON
+    :return: The report as a string
+    """
+    if recorded == None:
+        recorded = snapshot()
+    if asJson:
+        return json.dumps( recorded )
+    lines = [ "%-20s %10.6f s" % ( name, seconds )
+              for name, seconds in recorded['timers'].items() ]
+    lines += [ "%-20s %10d" % ( name, value )
+               for name, value in sorted( recorded['counters'].items() ) ]
+    return "\n".join( lines )
+
+def profileName( name ):
+    """
+    This function names the statistics of a puzzle after its
+    whole path, so puzzles of the same name in different
+    directories do not overwrite each other.
+    :param name: the name of the puzzle file
+    :return: The file name, with the separators of the path
+             replaced by double underscores
+    """
+    path = os.path.splitdrive( os.path.normpath( name ) )[1].lstrip( os.sep )
+    return path.replace( os.sep, "__" ) + ".prof"
+
+def profiled( directory, name, function, *arguments ):
+    """
+    This function calls a function under cProfile and dumps
+    the statistics to a file named after the puzzle, see
+    profileName.
+    :param directory: where to write the statistics
+    :param name: the name of the puzzle file
+    :param function: the function to call
+    :param arguments: the arguments of the function
+    :return: What the function returns
+    """
+    os.makedirs( directory, exist_ok=True )
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall( function, *arguments )
+    finally:
+        profile.dump_stats( os.path.join( directory, profileName( name ) ) )
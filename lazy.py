@@ -0,0 +1,217 @@
+"""
+This module answers single queries on a pond without building
+it. A LazyPuzzle memory maps the puzzle file and reads rocks
+straight out of the text, so opening a pond costs the same
+whatever its size. Slides are only worked out when a search
+asks for them, and are remembered in a cache of bounded size,
+so the time and memory of a query grow with the part of the
+pond it explores rather than with the pond.
+
+A LazyPuzzle can be handed to escape.findDJI in place of the
+slide tables, with cell ids, as in pond.CompactPuzzle, as nodes.
+Its findExit searches to whichever exit is nearest:
+
+    python lazy.py test1 0 4
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import mmap
+import sys
+from collections import OrderedDict
+
+import escape
+import heap
+import pond
+
+# The number of slides a LazyPuzzle remembers by default
+CACHE_SIZE = 1 << 16
+
+# The step along the pond, in rows and columns, of each direction
+STEPS = { 'left': ( 0, -1 ), 'up': ( -1, 0 ), 'right': ( 0, 1 ), 'down': ( 1, 0 ) }
+
+class LazyPuzzle(object):
+    """
+    This class is a view of a puzzle file that works out the
+    slides of a position when they are first asked for.
+    Positions are integer cell ids, as in pond.CompactPuzzle.
+    """
+
+    __slots__ = 'height', 'width', 'escape', 'exit', 'exits', 'exitIds', 'file', 'data', \
+                'start', 'stride', 'slides', 'cacheSize', 'hits', 'misses'
+
+    def __init__( self, fileName, cacheSize=CACHE_SIZE ):
+        """
+        The initialization method. Only the header and the first
+        row are read; every row must have the length of the first.
+        :param fileName: The name of the puzzle file
+        :param cacheSize: the number of slides to remember
+        :return: None
+        """
+        self.file = open( fileName, 'rb' )
+        self.height, self.width, self.escape, exits = pond.readHeader( self.file.readline() )
+        self.exit = self.height * self.width
+        self.exits = ( ( 'right', self.escape ), ) + exits
+        self.exitIds = { side: self.exit + number for number, side
+                         in enumerate( self.exits ) }
+        self.start = self.file.tell()
+        self.data = None
+        self.stride = self.width + 1
+        if self.exit > 0:
+            self.data = mmap.mmap( self.file.fileno(), 0, access=mmap.ACCESS_READ )
+            end = self.data.find( b'\n', self.start )
+            if end == -1:
+                end = len( self.data )
+            self.stride = end + 1 - self.start
+            first = self.data[self.start:end].rstrip( b'\r' )
+            last = self.start + ( self.height - 1 ) * self.stride
+            if len( first ) != self.width or len( self.data ) < last + self.width:
+                self.close()
+                raise ValueError( "Rows of " + fileName + " are not " + str(self.width) + " long" )
+
+        self.slides = OrderedDict()
+        self.cacheSize = cacheSize
+        self.hits = 0
+        self.misses = 0
+
+    def close( self ):
+        """
+        This method unmaps and closes the puzzle file.
+        :return: None
+        """
+        if self.data != None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def cell( self, row, column ):
+        """
+        This method returns the id of a position.
+        :param row: The row of the position
+        :param column: The column of the position
+        :return: The id of the position
+        """
+        if 0 <= row < self.height and 0 <= column < self.width:
+            return row * self.width + column
+        return self.exitIds[( 'right', row ) if column == self.width else
+                            ( 'left', row ) if column == -1 else
+                            ( 'up', column ) if row == -1 else ( 'down', column )]
+
+    def position( self, cell ):
+        """
+        This method returns the row and column of a position.
+        :param cell: The id of the position
+        :return: The row and column of the position, just off
+                 the pond for an exit
+        """
+        if cell < self.exit:
+            return divmod( cell, self.width )
+        side, index = self.exits[cell - self.exit]
+        if side == 'right':
+            return index, self.width
+        if side == 'left':
+            return index, -1
+        if side == 'up':
+            return -1, index
+        return self.height, index
+
+    def isRock( self, row, column ):
+        """
+        This method reads one position of the pond from the file.
+        :param row: The row of the position
+        :param column: The column of the position
+        :return: True if the position is a rock
+        """
+        return self.data[self.start + row * self.stride + column] != 46
+
+    def slide( self, start, direction ):
+        """
+        This method finds where a slide stops, from the cache if
+        it has been worked out before.
+        :param start: The id of the starting position
+        :param direction: The direction in which we are sliding
+        :return: The id of the position where we stop sliding
+        """
+        if start >= self.exit:
+            return start
+        key = ( start, direction )
+        stop = self.slides.get( key )
+        if stop != None:
+            self.hits += 1
+            self.slides.move_to_end( key )
+            return stop
+
+        self.misses += 1
+        stop = self.walk( start, direction )
+        self.slides[key] = stop
+        if len( self.slides ) > self.cacheSize:
+            self.slides.popitem( last=False )
+        return stop
+
+    def findExit( self, start, queue=heap.Heap ):
+        """
+        This method finds a shortest path from a position to
+        whichever exit is nearest, with escape.searchDJI stopping
+        as soon as it settles an exit.
+        :param start: The id of the starting position
+        :param queue: The priority queue class, see escape.findDJI
+        :return: A list of the cell ids of the path, ending with
+                 the exit, or None if there is no path
+        """
+        exits = range( self.exit, self.exit + len( self.exits ) )
+        dist, prev = escape.searchDJI( start, self, queue, ends=exits )
+        reached = [ exit for exit in exits if exit in dist ]
+        if len( reached ) == 0:
+            return None
+        return escape.backtrack( start, min( reached, key=dist.get ), prev )
+
+    def walk( self, start, direction ):
+        """
+        This method slides through the text of the pond.
+        :param start: The id of the starting position
+        :param direction: The direction in which we are sliding
+        :return: The id of the position where we stop sliding
+        """
+        rowStep, columnStep = STEPS[direction]
+        row, column = divmod( start, self.width )
+        while True:
+            nextRow = row + rowStep
+            nextColumn = column + columnStep
+            if not ( 0 <= nextRow < self.height and 0 <= nextColumn < self.width ):
+                lane = row if rowStep == 0 else column
+                return self.exitIds.get( ( direction, lane ), row * self.width + column )
+            if self.isRock( nextRow, nextColumn ):
+                return row * self.width + column
+            row = nextRow
+            column = nextColumn
+
+def main( arguments=None ):
+    """
+    This function finds a shortest path from one position of a
+    puzzle file, and prints it with how much of the pond was read.
+    :param arguments: the file name, row and column, or None for sys.argv
+    :return: None
+    """
+    arguments = sys.argv[1:] if arguments == None else arguments
+    if len( arguments ) != 3:
+        print( "usage: python lazy.py PUZZLE ROW COLUMN" )
+        return
+    puzzle = LazyPuzzle( arguments[0] )
+    row, column = int( arguments[1] ), int( arguments[2] )
+    if not ( 0 <= row < puzzle.height and 0 <= column < puzzle.width ) or \
+            puzzle.isRock( row, column ):
+        print( "(" + str(column) + ", " + str(row) + ") is not an open position" )
+    else:
+        path = puzzle.findExit( puzzle.cell( row, column ) )
+        if path == None:
+            print( "No path" )
+        else:
+            print( str( len( path ) - 1 ) + ": " +
+                   str( [ "(" + str(cell % puzzle.width) + ", " + str(cell // puzzle.width) + ")"
+                          for cell in path[:-1] ] ) )
+        print( "%d slides worked out, %d remembered" % ( puzzle.misses, puzzle.hits ),
+               file=sys.stderr )
+    puzzle.close()
+
+if __name__ == '__main__':
+    main()
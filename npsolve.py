@@ -0,0 +1,174 @@
+"""
+This module is an optional NumPy backend for solving a
+frozen pond puzzle. The pond is held as a boolean array of
+rocks, the slide stops of every position are computed with
+whole-array operations, and the pond is solved with a level
+synchronous breadth first search backwards from the exit
+that expands a whole layer of positions at a time.
+
+Positions are identified by the same cell ids as in the
+pond module ( row * width + column, with the exit at
+height * width ).
+
+NumPy is not required by the rest of the puzzle. If it is
+missing, HAVE_NUMPY is False and escape.testingSpots falls
+back to the pure Python solver.
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    np = None
+    HAVE_NUMPY = False
+
+def readRocks( fileName ):
+    """
+    This function reads a frozen pond puzzle into a
+    boolean array of rocks. The header and rows are read and
+    checked by pond.readHeader and pond.rockRows, so a file
+    is rejected here exactly when the other solvers reject it.
+    :param fileName: The name of the file we want to read from
+    :return: The height, width and escape row of the puzzle,
+             and a height x width array that is True for rocks
+    """
+    import mmap
+    import pond
+
+    with open( fileName, 'rb' ) as file:
+        height, width, escape, exits = pond.readHeader( file.readline() )
+        if len( exits ) > 0:
+            raise ValueError( "The NumPy solver only solves puzzles with one exit" )
+        body = b''
+        if height > 0:
+            start = file.tell()
+            with mmap.mmap( file.fileno(), 0, access=mmap.ACCESS_READ ) as data:
+                body = b''.join( pond.rockRows( data, start, height, width ) )
+
+    rocks = np.frombuffer( body, dtype=np.uint8 ).reshape( height, width ) != 0
+    return height, width, escape, rocks
+
+def slideStops( rocks, escape ):
+    """
+    This function computes where a slide from every position
+    stops. A slide left stops at the start of the run of open
+    positions it is in, so the stops are the column of the
+    latest run start, carried along each row by a running
+    maximum. The other directions are the same idea flipped
+    or transposed.
+    :param rocks: the height x width array of rocks
+    :param escape: the row where the exit is located
+    :return: A dictionary from directions to flat arrays of
+             the cell id of each stop, -1 for rocks
+    """
+
+    height, width = rocks.shape
+    exit = height * width
+    opened = ~rocks
+    columns = np.broadcast_to( np.arange( width ), rocks.shape )
+    rows = np.broadcast_to( np.arange( height )[:, None], rocks.shape )
+
+    # Positions whose left, right, up or down side is blocked
+    blocked = {}
+    for direction in ( 'left', 'right', 'up', 'down' ):
+        blocked[direction] = opened.copy()
+    blocked['left'][:, 1:] &= rocks[:, :-1]
+    blocked['right'][:, :-1] &= rocks[:, 1:]
+    blocked['up'][1:, :] &= rocks[:-1, :]
+    blocked['down'][:-1, :] &= rocks[1:, :]
+
+    # Carry the latest blocked position along each lane
+    left = np.maximum.accumulate(
+        np.where( blocked['left'], columns, 0 ), axis=1 )
+    right = np.minimum.accumulate(
+        np.where( blocked['right'], columns, width )[:, ::-1], axis=1 )[:, ::-1]
+    up = np.maximum.accumulate(
+        np.where( blocked['up'], rows, 0 ), axis=0 )
+    down = np.minimum.accumulate(
+        np.where( blocked['down'], rows, height )[::-1, :], axis=0 )[::-1, :]
+
+    stops = {
+        'left': rows * width + left,
+        'right': rows * width + right,
+        'up': up * width + columns,
+        'down': down * width + columns }
+
+    # Sliding right off the end of the escape row escapes
+    if height > 0 and width > 0:
+        stops['right'][escape][right[escape] == width - 1] = exit
+
+    for direction in stops:
+        stops[direction] = np.where( rocks, -1, stops[direction] ).ravel()
+    return stops
+
+def solve( rocks, escape ):
+    """
+    This function finds the number of moves needed to reach the
+    exit from every position. The reversed slides are gathered
+    into one array sorted by stop, so the positions that slide
+    into a whole layer of stops are collected with a handful of
+    array operations per layer.
+    :param rocks: the height x width array of rocks
+    :param escape: the row where the exit is located
+    :return: A height x width array of moves, -1 for rocks and
+             for positions that cannot reach the exit
+    """
+
+    height, width = rocks.shape
+    exit = height * width
+    stops = slideStops( rocks, escape )
+
+    # Every slide, as ( start, stop ), skipping rocks and
+    # slides that do not move
+    cells = np.flatnonzero( ~rocks.ravel() )
+    starts = np.concatenate( [ cells ] * 4 )
+    ends = np.concatenate( [ stops[direction][cells]
+                             for direction in ( 'left', 'up', 'right', 'down' ) ] )
+    moving = starts != ends
+    starts = starts[moving]
+    ends = ends[moving]
+
+    # Group the slides by where they stop
+    order = np.argsort( ends, kind='stable' )
+    starts = starts[order]
+    offsets = np.zeros( exit + 2, dtype=np.int64 )
+    np.cumsum( np.bincount( ends, minlength=exit + 1 ), out=offsets[1:] )
+
+    dist = np.full( exit + 1, -1, dtype=np.int64 )
+    dist[exit] = 0
+    frontier = np.array( [exit], dtype=np.int64 )
+    moves = 0
+
+    while frontier.size:
+        moves += 1
+
+        # Gather the slides into every stop of the layer
+        first = offsets[frontier]
+        counts = offsets[frontier + 1] - first
+        total = int( counts.sum() )
+        if total == 0:
+            break
+        shift = np.repeat( first - ( np.cumsum( counts ) - counts ), counts )
+        found = starts[ shift + np.arange( total ) ]
+
+        # Keep the positions seen for the first time
+        found = np.unique( found[ dist[found] == -1 ] )
+        dist[found] = moves
+        frontier = found
+
+    return dist[:exit].reshape( height, width )
+
+def solveFile( fileName ):
+    """
+    This function solves a frozen pond puzzle with NumPy.
+    :param fileName: The name of the puzzle file
+    :return: The puzzle as a pond.CompactPuzzle, and a list
+             of the moves needed from every cell, -1 if none
+    """
+    import pond
+
+    height, width, escapeRow, rocks = readRocks( fileName )
+    puzzle = pond.CompactPuzzle( height, width, escapeRow, bytearray( rocks.tobytes() ) )
+    return puzzle, solve( rocks, escapeRow ).ravel().tolist() + [0]
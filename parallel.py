@@ -0,0 +1,207 @@
+"""
+This module solves one large pond on several processors. It
+is the reverse search of escape.solveCompact, done one layer
+of moves at a time: the positions reached with d moves are
+split into chunks, the chunks are expanded on a pool of worker
+processes, and what they reach is the next layer.
+
+The rocks, the moves and the first moves of every cell id live
+in multiprocessing.shared_memory blocks that every worker maps,
+so only the chunks and the positions reached are sent between
+processes. Two workers may reach the same position in the same
+layer. Both then write the same number of moves, and either
+first move is a shortest one, so no locking is needed; the
+position is kept once in the next layer, for the first chunk
+that reached it. With several exits the workers leave the
+nearest exit alone, and the calling process copies it from
+whichever first move was written last, so a position's path
+always ends at its nearest exit.
+
+    python -m benchmarks.parallel
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import escape
+import pond
+
+# Layers smaller than this are expanded in the calling process,
+# where they cost less than sending them to a worker
+SMALLEST_SHARED = 2048
+
+# The number of chunks a layer is split into per worker
+CHUNKS_PER_WORKER = 4
+
+# The puzzle and arrays of a worker process, set by attach
+shared = {}
+
+def integers( block, count ):
+    """
+    This function views a shared memory block as integers. The
+    block may be larger than asked for, since its size is
+    rounded up to whole pages.
+    :param block: the SharedMemory
+    :param count: the number of integers wanted
+    :return: A memoryview of count 32 bit integers
+    """
+    return block.buf[:count * 4].cast( 'i' )
+
+def attach( names, height, width, escapeRow, exits ):
+    """
+    This function maps the shared arrays in a worker process.
+    :param names: the names of the rocks, moves, first move and,
+                  for several exits, nearest exit blocks
+    :param height: the height of the puzzle
+    :param width: the width of the puzzle
+    :param escapeRow: the row where the exit is located
+    :param exits: the other exits of the puzzle
+    :return: None
+    """
+    blocks = [ shared_memory.SharedMemory( name=name ) for name in names ]
+    puzzle = pond.CompactPuzzle( height, width, escapeRow, blocks[0].buf, exits )
+    shared['blocks'] = blocks
+    shared['puzzle'] = puzzle
+    shared['arrays'] = [ integers( block, puzzle.size ) for block in blocks[1:] ]
+
+def expandChunk( chunk, moves ):
+    """
+    This function expands a chunk of a layer in a worker process.
+    Only the moves and first moves are written; the nearest exits
+    are left to expandLayer.
+    :param chunk: the positions of the chunk, as bytes of an
+                  array of 32 bit integers
+    :param moves: the number of moves of the positions reached
+    :return: The positions reached, as bytes of an array of
+             32 bit integers
+    """
+    layer = array( 'i' )
+    layer.frombytes( chunk )
+    return expand( shared['puzzle'], shared['arrays'][:2], layer, moves ).tobytes()
+
+def expand( puzzle, arrays, layer, moves ):
+    """
+    This function gives every position that slides into one of
+    the given positions, and has not been reached, the given
+    number of moves.
+    :param puzzle: the CompactPuzzle
+    :param arrays: the moves needed from every cell, -1 if none
+                   yet, the first move from every cell and, for
+                   several exits, the nearest exit of every cell
+    :param layer: the positions reached with one move fewer
+    :param moves: the number of moves of the positions reached
+    :return: An array of the positions reached
+    """
+    reached = array( 'i' )
+    walk = puzzle.slidesInto
+    dist = arrays[0]
+    next = arrays[1]
+    if len( arrays ) == 2:
+        for current in layer:
+            for direction in escape.DIRECTIONS:
+                for n in walk( current, direction ):
+                    if dist[n] == -1:
+                        dist[n] = moves
+                        next[n] = current
+                        reached.append( n )
+        return reached
+
+    via = arrays[2]
+    for current in layer:
+        for direction in escape.DIRECTIONS:
+            for n in walk( current, direction ):
+                if dist[n] == -1:
+                    dist[n] = moves
+                    next[n] = current
+                    via[n] = via[current]
+                    reached.append( n )
+    return reached
+
+def solveParallel( puzzle, workers=None ):
+    """
+    This function is escape.solveCompact on a pool of worker
+    processes.
+    :param puzzle: the CompactPuzzle to solve
+    :param workers: the number of processes, or None for one
+                    per processor
+    :return: The PathTree of the puzzle
+    """
+    workers = workers or os.cpu_count() or 1
+    count = 3 if len( puzzle.exits ) > 1 else 2
+    blocks = [ shared_memory.SharedMemory( create=True, size=max( 1, len( puzzle.rocks ) ) ) ]
+    blocks += [ shared_memory.SharedMemory( create=True, size=puzzle.size * 4 )
+                for block in range( count ) ]
+    arrays = []
+    try:
+        blocks[0].buf[:len( puzzle.rocks )] = bytes( puzzle.rocks )
+        arrays = [ integers( block, puzzle.size ) for block in blocks[1:] ]
+        for values in arrays:
+            values[:] = array( 'i', [-1] ) * puzzle.size
+        view = pond.CompactPuzzle( puzzle.height, puzzle.width, puzzle.escape,
+                                   blocks[0].buf, puzzle.exits[1:] )
+
+        layer = array( 'i', range( puzzle.exit, puzzle.size ) )
+        for exit in layer:
+            arrays[0][exit] = 0
+            if count == 3:
+                arrays[2][exit] = exit
+
+        with ProcessPoolExecutor( max_workers=workers, initializer=attach,
+                                  initargs=( [ block.name for block in blocks ],
+                                             puzzle.height, puzzle.width,
+                                             puzzle.escape, puzzle.exits[1:] ) ) as pool:
+            moves = 0
+            while len( layer ) > 0:
+                moves += 1
+                layer = expandLayer( pool, workers, view, arrays, layer, moves )
+
+        copies = [ array( 'l', values ) for values in arrays ]
+        return escape.PathTree( puzzle, copies[0], copies[1],
+                                copies[2] if count == 3 else None )
+    finally:
+        for values in arrays:
+            values.release()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def expandLayer( pool, workers, puzzle, arrays, layer, moves ):
+    """
+    This function expands one layer, on the pool if it is large.
+    :param pool: the pool of worker processes
+    :param workers: the number of worker processes
+    :param puzzle: the CompactPuzzle over the shared rocks
+    :param arrays: the shared arrays, as in expand
+    :param layer: the positions reached with one move fewer
+    :param moves: the number of moves of the positions reached
+    :return: An array of the positions reached, each once
+    """
+    if len( layer ) < SMALLEST_SHARED:
+        return expand( puzzle, arrays, layer, moves )
+
+    size = -( -len( layer ) // ( workers * CHUNKS_PER_WORKER ) )
+    futures = [ pool.submit( expandChunk, layer[start:start + size].tobytes(), moves )
+                for start in range( 0, len( layer ), size ) ]
+
+    # Keep a position for the first chunk that reached it
+    reached = array( 'i' )
+    seen = set()
+    for future in futures:
+        chunk = array( 'i' )
+        chunk.frombytes( future.result() )
+        for n in chunk:
+            if n not in seen:
+                seen.add( n )
+                reached.append( n )
+
+    # The nearest exit follows the first move that was kept
+    if len( arrays ) == 3:
+        next = arrays[1]
+        via = arrays[2]
+        for n in reached:
+            via[n] = via[next[n]]
+    return reached
@@ -0,0 +1,429 @@
+"""
+This module holds a compact representation of a frozen
+pond puzzle. Rather than one Node object per position,
+the pond is stored as a flat bytearray of rock flags and
+every position is identified by the integer
+
+    cell = row * width + column
+
+so that its neighbors can be computed from the index alone.
+The escape position, just past the last column of the escape
+row, is given the id height * width. A pond may have more exits,
+on any side, listed after the escape row in the header of its
+file as a side letter and a row or column:
+
+    10 10 4 L2 T0 B9
+
+adds exits off the left of row 2, the top of column 0 and the
+bottom of column 9. They are given the ids height * width + 1,
+height * width + 2 and so on, in the order they are listed.
+
+Memory, measured with tracemalloc on randomly generated ponds
+with 30% rocks ( buildPuzzle output versus CompactPuzzle, and
+the four slide tables of each ):
+
+    pond           Node graph   SlideTables   CompactPuzzle   stops
+    200 x 200        2.5 MB        1.5 MB         39 KB       1.2 MB
+    1000 x 1000     77.7 MB       33.8 MB        977 KB      30.5 MB
+
+so the compact pond itself is about 80 times smaller, while
+its optional slide tables ( four arrays of machine integers )
+cost about the same as the Node based ones.
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import mmap
+from array import array
+
+# The side letters of the exits in a header, and the direction
+# of the slide that leaves the pond through each side
+SIDES = { 'R': 'right', 'L': 'left', 'T': 'up', 'B': 'down' }
+
+# Translation table from the bytes of a puzzle file to rock
+# flags: '.' is open water, anything else is a rock
+ROCK_FLAGS = bytes( 0 if byte == ord('.') else 1 for byte in range( 256 ) )
+
+class CompactPuzzle(object):
+    """
+    This class represents a frozen pond puzzle as a flat
+    array of rock flags. Positions are integer cell ids.
+    """
+
+    __slots__ = 'height', 'width', 'escape', 'rocks', 'exit', 'stops', \
+                'exits', 'exitIds', 'size'
+
+    def __init__( self, height, width, escape, rocks, exits=() ):
+        """
+        The initialization method.
+        :param height: the height of the puzzle
+        :param width: the width of the puzzle
+        :param escape: the row where the exit is located
+        :param rocks: a bytearray of height * width flags,
+                      one per position, that are 1 for rocks
+        :param exits: any more exits, as pairs of the direction
+                      of the slide out through them and the row
+                      or column they are next to
+        :return: None
+        """
+        self.height = height
+        self.width = width
+        self.escape = escape
+        self.rocks = rocks
+        self.exit = height * width
+        self.stops = None
+
+        # Every exit, the escape row first, and their ids
+        self.exits = ( ( 'right', escape ), ) + tuple( exits )
+        self.exitIds = { side: self.exit + number
+                         for number, side in enumerate( self.exits ) }
+        self.size = self.exit + len( self.exits )
+
+    def cell( self, row, column ):
+        """
+        This method returns the id of a position.
+        :param row: The row of the position
+        :param column: The column of the position
+        :return: The id of the position
+        """
+        if 0 <= row < self.height and 0 <= column < self.width:
+            return row * self.width + column
+        if column == self.width:
+            return self.exitIds[( 'right', row )]
+        if column == -1:
+            return self.exitIds[( 'left', row )]
+        if row == -1:
+            return self.exitIds[( 'up', column )]
+        return self.exitIds[( 'down', column )]
+
+    def position( self, cell ):
+        """
+        This method returns the row and column of a position.
+        :param cell: The id of the position
+        :return: The row and column of the position, just off
+                 the pond for an exit
+        """
+        if cell < self.exit:
+            return divmod( cell, self.width )
+        side, index = self.exits[cell - self.exit]
+        if side == 'right':
+            return index, self.width
+        if side == 'left':
+            return index, -1
+        if side == 'up':
+            return -1, index
+        return self.height, index
+
+    def isOpen( self, cell ):
+        """
+        This method checks whether a position can be stood on.
+        :param cell: The id of the position
+        :return: True if the position is an open exit or not a rock
+        """
+        if cell >= self.exit:
+            return self.exitOpen( cell )
+        return not self.rocks[cell]
+
+    def exitOpen( self, exit=None ):
+        """
+        This method checks whether an exit can be reached at
+        all, that is, whether the position next to it is open.
+        :param exit: The id of the exit, or None for the escape row
+        :return: True if the position next to the exit is open
+        """
+        return self.height > 0 and self.width > 0 and \
+            not self.rocks[self.edge( self.exit if exit == None else exit )]
+
+    def edge( self, exit ):
+        """
+        This method finds the position next to an exit.
+        :param exit: The id of the exit
+        :return: The id of the position a slide leaves through it from
+        """
+        side, index = self.exits[exit - self.exit]
+        if side == 'right':
+            return index * self.width + self.width - 1
+        if side == 'left':
+            return index * self.width
+        if side == 'up':
+            return index
+        return ( self.height - 1 ) * self.width + index
+
+    def neighbor( self, cell, direction ):
+        """
+        This method finds the position next to the given one.
+        :param cell: The id of the position
+        :param direction: The direction of the neighbor
+        :return: The id of the neighbor, or -1 if it is a rock
+                 or off the pond without an exit
+        """
+        if cell >= self.exit:
+            return -1
+        row, column = divmod( cell, self.width )
+        if direction == 'left':
+            if column == 0:
+                return self.exitIds.get( ( 'left', row ), -1 )
+            n = cell - 1
+        elif direction == 'right':
+            if column == self.width - 1:
+                return self.exitIds.get( ( 'right', row ), -1 )
+            n = cell + 1
+        elif direction == 'up':
+            if row == 0:
+                return self.exitIds.get( ( 'up', column ), -1 )
+            n = cell - self.width
+        else:
+            if row == self.height - 1:
+                return self.exitIds.get( ( 'down', column ), -1 )
+            n = cell + self.width
+        return -1 if self.rocks[n] else n
+
+    def slide( self, start, direction ):
+        """
+        This method simulates sliding along the pond from a
+        starting position until hitting a rock or the edge.
+        Once buildStops has been called this is a single lookup.
+        :param start: The id of the starting position
+        :param direction: The direction in which we are sliding
+        :return: The id of the position where we stop sliding
+        """
+        if self.stops != None:
+            return self.stops[direction][start]
+
+        current = start
+        n = self.neighbor( current, direction )
+        while n != -1:
+            current = n
+            n = self.neighbor( current, direction )
+        return current
+
+    def slidesInto( self, stop, direction ):
+        """
+        This method is the reverse of slide. It finds every
+        position that stops at the given one when sliding in
+        the given direction, by walking backwards from the stop
+        until hitting a rock or the edge.
+        :param stop: The id of the position where the slide ends
+        :param direction: The direction in which we are sliding
+        :return: A list of the ids that slide into stop
+        """
+
+        width = self.width
+        rocks = self.rocks
+
+        # An exit is only reached by sliding out through its side
+        if stop >= self.exit:
+            if direction != self.exits[stop - self.exit][0] or not self.exitOpen( stop ):
+                return []
+            stop = self.edge( stop )
+        elif self.neighbor( stop, direction ) != -1:
+            return []
+
+        # Walk against the direction of the slide until the
+        # edge ( limit ) or a rock
+        row, column = divmod( stop, width )
+        if direction == 'left':
+            step, limit = 1, stop + width - 1 - column
+        elif direction == 'right':
+            step, limit = -1, stop - column
+        elif direction == 'up':
+            step, limit = width, stop + ( self.height - 1 - row ) * width
+        else:
+            step, limit = -width, column
+
+        starts = [stop]
+        current = stop
+        while current != limit and not rocks[current + step]:
+            current += step
+            starts.append( current )
+        return starts
+
+    def buildStops( self ):
+        """
+        This method precomputes where every slide stops, with a
+        single sweep over the pond per direction. Afterwards
+        slide is a single lookup. Rocks are given the stop -1.
+        :return: None
+        """
+
+        height = self.height
+        width = self.width
+        rocks = self.rocks
+        exitIds = self.exitIds
+        stops = {}
+        for direction in ( 'left', 'right', 'up', 'down' ):
+            stops[direction] = array( 'l', [-1] ) * self.size
+            for exit in range( self.exit, self.size ):
+                stops[direction][exit] = exit
+
+        left = stops['left']
+        right = stops['right']
+        for row in range( height ):
+            base = row * width
+            stop = -1
+            for cell in range( base, base + width ):
+                if rocks[cell]:
+                    continue
+                if cell == base:
+                    stop = exitIds.get( ( 'left', row ), cell )
+                elif rocks[cell - 1]:
+                    stop = cell
+                left[cell] = stop
+            for cell in range( base + width - 1, base - 1, -1 ):
+                if rocks[cell]:
+                    continue
+                if cell == base + width - 1:
+                    stop = exitIds.get( ( 'right', row ), cell )
+                elif rocks[cell + 1]:
+                    stop = cell
+                right[cell] = stop
+
+        up = stops['up']
+        down = stops['down']
+        for column in range( width ):
+            stop = -1
+            for cell in range( column, self.exit, width ):
+                if rocks[cell]:
+                    continue
+                if cell < width:
+                    stop = exitIds.get( ( 'up', column ), cell )
+                elif rocks[cell - width]:
+                    stop = cell
+                up[cell] = stop
+            for cell in range( self.exit - width + column, -1, -width ):
+                if rocks[cell]:
+                    continue
+                if cell + width >= self.exit:
+                    stop = exitIds.get( ( 'down', column ), cell )
+                elif rocks[cell + width]:
+                    stop = cell
+                down[cell] = stop
+
+        self.stops = stops
+
+def fromText( puzzleText, puzzleWidth, puzzleHeight, escapeRow ):
+    """
+    This function builds a compact puzzle from the textual
+    representation returned by escape.readTest.
+    :param puzzleText: the text representing the puzzle as
+                       a 2d array of strings
+    :param puzzleWidth: the width of the puzzle
+    :param puzzleHeight: the height of the puzzle
+    :param escapeRow: the row where the exit is located
+    :return: A CompactPuzzle
+    """
+    rocks = bytearray( puzzleWidth * puzzleHeight )
+    for row in range( puzzleHeight ):
+        base = row * puzzleWidth
+        for column in range( puzzleWidth ):
+            if puzzleText[row][column] != '.':
+                rocks[base + column] = 1
+    return CompactPuzzle( puzzleHeight, puzzleWidth, escapeRow, rocks )
+
+def readHeader( line ):
+    """
+    This function reads and checks the first line of a
+    puzzle file.
+    :param line: The first line of the file, as bytes
+    :return: The height, width and escape row of the puzzle,
+             and its other exits as described in CompactPuzzle
+    """
+    numbers = line.split()
+    if len( numbers ) < 3:
+        raise ValueError( "Expected 'height width escape' header, got " + repr(line) )
+    try:
+        height, width, escape = [ int(number) for number in numbers[:3] ]
+    except ValueError:
+        raise ValueError( "Header is not three integers: " + repr(line) )
+    if height < 0 or width < 0:
+        raise ValueError( "Negative puzzle dimensions: " + repr(line) )
+    if height > 0 and not 0 <= escape < height:
+        raise ValueError( "Escape row " + str(escape) + " is outside the puzzle" )
+    return height, width, escape, readExits( numbers[3:], height, width, escape )
+
+def readExits( tokens, height, width, escape ):
+    """
+    This function reads the exits listed after the escape row
+    in the header of a puzzle file, such as b'L2' or b'T0'.
+    :param tokens: The words of the header after the escape row
+    :param height: The height of the puzzle
+    :param width: The width of the puzzle
+    :param escape: The escape row
+    :return: A tuple of the exits, as pairs of the direction of
+             the slide out through them and their row or column
+    """
+    exits = []
+    seen = { ( 'right', escape ) }
+    for token in tokens:
+        token = token.decode( 'ascii', 'replace' ) if isinstance( token, bytes ) else token
+        side = SIDES.get( token[:1].upper() )
+        if side == None or not token[1:].isdigit():
+            raise ValueError( "Expected an exit such as R1, L3, T0 or B2, got " + repr(token) )
+        index = int( token[1:] )
+        if index >= ( height if side in ( 'left', 'right' ) else width ):
+            raise ValueError( "Exit " + token + " is outside the puzzle" )
+        if ( side, index ) in seen:
+            raise ValueError( "Exit " + token + " is listed twice" )
+        seen.add( ( side, index ) )
+        exits.append( ( side, index ) )
+    return tuple( exits )
+
+def rockRows( data, start, height, width ):
+    """
+    This generator walks the rows of a puzzle file one at a
+    time and yields each as a bytes object of rock flags.
+    Each row is checked against the width from the header,
+    and the number of rows against the height.
+    :param data: The contents of the file, such as an mmap
+    :param start: The offset of the first row
+    :param height: The height from the header
+    :param width: The width from the header
+    :return: A generator of height rows of rock flags
+    """
+    position = start
+    for row in range( height ):
+        if position >= len( data ):
+            raise ValueError( "Expected " + str(height) + " rows, found " + str(row) )
+        end = data.find( b'\n', position )
+        if end == -1:
+            end = len( data )
+        line = data[position:end].rstrip( b'\r' )
+        if len( line ) != width:
+            raise ValueError( "Row " + str(row) + " has " + str(len(line)) +
+                              " positions, expected " + str(width) )
+        yield line.translate( ROCK_FLAGS )
+        position = end + 1
+
+    if data[position:].strip():
+        raise ValueError( "Found more than " + str(height) + " rows" )
+
+def readCompact( fileName ):
+    """
+    This function reads a puzzle file straight into a
+    CompactPuzzle. The file is memory mapped and its rows
+    are translated to rock flags one row at a time, so no
+    object is created per position and the file is never
+    held in memory twice. Binary ponds, written by
+    binary.writePond, are recognised and loaded as they are.
+    :param fileName: The name of the file we want to read from
+    :return: A CompactPuzzle
+    """
+    import binary
+    if binary.isBinaryPond( fileName ):
+        return binary.readPond( fileName )
+
+    with open( fileName, 'rb' ) as file:
+        height, width, escape, exits = readHeader( file.readline() )
+        rocks = bytearray( height * width )
+        if height == 0:
+            return CompactPuzzle( height, width, escape, rocks, exits )
+
+        start = file.tell()
+        with mmap.mmap( file.fileno(), 0, access=mmap.ACCESS_READ ) as data:
+            base = 0
+            for line in rockRows( data, start, height, width ):
+                rocks[base:base + width] = line
+                base += width
+
+    return CompactPuzzle( height, width, escape, rocks, exits )
+
@@ -0,0 +1,139 @@
+"""
+This module builds a reachability index for a frozen pond
+puzzle, so that any position can be classified as able or
+unable to reach the exit in O(1), before any shortest path
+work is done.
+
+The slide graph is split into strongly connected components:
+sets of positions that can all slide to one another. These
+form a directed acyclic graph, and a component can reach the
+exit exactly when it holds the exit or one of the components
+it slides into can. Tarjan's algorithm finishes every component
+after all the components it slides into, so that can be decided
+for each component as soon as it is found.
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+from array import array
+
+# The directions in which a position can slide
+DIRECTIONS = ( 'left', 'up', 'right', 'down' )
+
+class ReachabilityIndex(object):
+    """
+    This class records, for every cell of a compact puzzle, its
+    strongly connected component, and for every component
+    whether it can reach the exit.
+    """
+
+    __slots__ = 'component', 'reaches'
+
+    def __init__( self, component, reaches ):
+        """
+        The initialization method.
+        :param component: the component of every cell id, -1 for rocks
+        :param reaches: a flag per component, 1 if it can reach the exit
+        :return: None
+        """
+        self.component = component
+        self.reaches = reaches
+
+    def reachable( self, cell ):
+        """
+        This method checks whether a position can reach the exit.
+        :param cell: The id of the position
+        :return: True if there is a path to the exit
+        """
+        component = self.component[cell]
+        return component != -1 and self.reaches[component] == 1
+
+    def __len__( self ):
+        """
+        :return: The number of components
+        """
+        return len( self.reaches )
+
+def buildIndex( puzzle ):
+    """
+    This function builds the reachability index of a compact
+    puzzle with an iterative version of Tarjan's algorithm.
+    :param puzzle: a pond.CompactPuzzle
+    :return: The ReachabilityIndex of the puzzle
+    """
+    if puzzle.stops == None:
+        puzzle.buildStops()
+    stops = [ puzzle.stops[direction] for direction in DIRECTIONS ]
+    count = puzzle.size
+    exit = puzzle.exit
+
+    order = array( 'l', [-1] ) * count       # when each cell was found
+    low = array( 'l', [0] ) * count          # lowest order reachable
+    component = array( 'l', [-1] ) * count
+    onStack = bytearray( count )
+    reaches = bytearray()
+    stack = []
+    found = 0
+
+    for root in range( count ):
+        if order[root] != -1 or not puzzle.isOpen( root ):
+            continue
+
+        order[root] = low[root] = found
+        found += 1
+        stack.append( root )
+        onStack[root] = 1
+        work = [ [root, 0] ]
+
+        while (work):
+            frame = work[-1]
+            current = frame[0]
+
+            # Follow the next slide out of current
+            if frame[1] < 4:
+                n = stops[frame[1]][current]
+                frame[1] += 1
+                if n == current:
+                    continue
+                if order[n] == -1:
+                    order[n] = low[n] = found
+                    found += 1
+                    stack.append( n )
+                    onStack[n] = 1
+                    work.append( [n, 0] )
+                elif onStack[n] and order[n] < low[current]:
+                    low[current] = order[n]
+                continue
+
+            # Every slide out of current has been followed
+            work.pop()
+            if work and low[current] < low[work[-1][0]]:
+                low[work[-1][0]] = low[current]
+            if low[current] != order[current]:
+                continue
+
+            # current is the root of a component. Every component
+            # it slides into is already finished.
+            members = []
+            n = -1
+            while n != current:
+                n = stack.pop()
+                onStack[n] = 0
+                component[n] = len( reaches )
+                members.append( n )
+
+            canReach = 0
+            for n in members:
+                if n >= exit:
+                    canReach = 1
+                    break
+                for table in stops:
+                    other = component[table[n]]
+                    if other != len( reaches ) and reaches[other]:
+                        canReach = 1
+                        break
+                if canReach:
+                    break
+            reaches.append( canReach )
+
+    return ReachabilityIndex( component, reaches )
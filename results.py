@@ -0,0 +1,264 @@
+"""
+This module holds the solution of a whole pond as one array of
+moves per cell id, rather than a list of position strings per
+number of moves. The positions are only grouped, and only
+turned into text, when they are written out, and the writers
+below do that a chunk of positions at a time, so no string the
+size of a whole group is ever built.
+
+Three formats are written: the text of escape.printResults,
+
+    1: ['(0, 1)', '(1, 1)']
+    No path: ['(2, 2)']
+
+CSV, one position per line,
+
+    column,row,moves
+    0,1,1
+    2,2,
+
+and JSON lines, one object per number of moves, with 0 for
+the positions with no path, as in escape.testingSpots.
+
+    {"moves": 1, "positions": ["(0, 1)", "(1, 1)"]}
+
+Each format also has a streaming writer, which takes the layers
+of escape.solveLayers and writes every layer as it is found,
+in ascending order of moves, instead of a finished Results.
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+from array import array
+
+# The number of positions formatted at a time by the writers
+CHUNK = 4096
+
+class Results(object):
+    """
+    This class is the number of moves from every position of
+    a solved pond, kept in a flat array indexed by cell id.
+    """
+
+    __slots__ = 'puzzle', 'dist'
+
+    def __init__( self, puzzle, dist ):
+        """
+        The initialization method.
+        :param puzzle: the pond.CompactPuzzle that was solved
+        :param dist: the moves needed from every cell, -1 if none
+        :return: None
+        """
+        self.puzzle = puzzle
+        self.dist = dist
+
+    def moves( self, row, column ):
+        """
+        This method returns the number of moves from a position.
+        :param row: The row of the position
+        :param column: The column of the position
+        :return: The number of moves, or -1 if there is no path
+        """
+        return self.dist[ self.puzzle.cell( row, column ) ]
+
+    def label( self, cell ):
+        """
+        This method names a position the way testingSpots does.
+        :param cell: The id of the position
+        :return: The string "(column, row)"
+        """
+        row, column = divmod( cell, self.puzzle.width )
+        return "(" + str(column) + ", " + str(row) + ")"
+
+    def groups( self ):
+        """
+        This method groups the open positions by the number of
+        moves they need, going down each column in turn, so the
+        groups and the positions in them come in the same order
+        as in the dictionary of testingSpots.
+        :return: A dictionary from moves, 0 for no path, to an
+                 array of the cell ids that need them
+        """
+        groups = {}
+        dist = self.dist
+        rocks = self.puzzle.rocks
+        width = self.puzzle.width
+        exit = self.puzzle.exit
+        for column in range( width ):
+            for cell in range( column, exit, width ):
+                if rocks[cell]:
+                    continue
+                moves = dist[cell]
+                if moves < 0:
+                    moves = 0
+                group = groups.get( moves )
+                if group == None:
+                    group = groups[moves] = array( 'l' )
+                group.append( cell )
+        return groups
+
+    def steps( self ):
+        """
+        This method builds the dictionary of testingSpots.
+        :return: The dictionary described in escape.testingSpots
+        """
+        label = self.label
+        return { moves: [ label( cell ) for cell in cells ]
+                 for moves, cells in self.groups().items() }
+
+def writeCells( file, cells, name, chunk=CHUNK ):
+    """
+    This function writes a list of positions, separated by
+    commas, a chunk of positions at a time.
+    :param file: the file to write to
+    :param cells: the cell ids of the positions
+    :param name: a function from a cell id to its text
+    :param chunk: the number of positions per write
+    :return: None
+    """
+    for start in range( 0, len( cells ), chunk ):
+        if start > 0:
+            file.write( ", " )
+        file.write( ", ".join( [ name( cell ) for cell in cells[start:start + chunk] ] ) )
+
+def writeText( results, file, chunk=CHUNK ):
+    """
+    This function writes results in the format of
+    escape.printResults, with the positions that have no path
+    on the last line.
+    :param results: the Results to write
+    :param file: the file to write to
+    :param chunk: the number of positions per write
+    :return: None
+    """
+    groups = results.groups()
+    if len( groups ) == 0:
+        file.write( "No starting square.\n" )
+        return
+
+    label = results.label
+    name = lambda cell: "'" + label( cell ) + "'"
+    for moves, cells in groups.items():
+        if moves != 0:
+            file.write( str(moves) + ": [" )
+            writeCells( file, cells, name, chunk )
+            file.write( "]\n" )
+    file.write( "No path: [" )
+    writeCells( file, groups.get( 0, () ), name, chunk )
+    file.write( "]\n" )
+
+def writeCsv( results, file, chunk=CHUNK ):
+    """
+    This function writes results as CSV, one line per open
+    position, down each column in turn. The moves are left
+    empty where there is no path.
+    :param results: the Results to write
+    :param file: the file to write to
+    :param chunk: the number of positions per write
+    :return: None
+    """
+    puzzle = results.puzzle
+    dist = results.dist
+    file.write( "column,row,moves\n" )
+    lines = []
+    for column in range( puzzle.width ):
+        for cell in range( column, puzzle.exit, puzzle.width ):
+            if puzzle.rocks[cell]:
+                continue
+            moves = dist[cell]
+            lines.append( str(column) + "," + str(cell // puzzle.width) + "," +
+                          ( str(moves) if moves >= 0 else "" ) + "\n" )
+            if len( lines ) == chunk:
+                file.write( "".join( lines ) )
+                lines = []
+    file.write( "".join( lines ) )
+
+def writeJsonLines( results, file, chunk=CHUNK ):
+    """
+    This function writes results as JSON lines, one object
+    per number of moves, in the order of testingSpots.
+    :param results: the Results to write
+    :param file: the file to write to
+    :param chunk: the number of positions per write
+    :return: None
+    """
+    label = results.label
+    name = lambda cell: '"' + label( cell ) + '"'
+    for moves, cells in results.groups().items():
+        file.write( '{"moves": ' + str(moves) + ', "positions": [' )
+        writeCells( file, cells, name, chunk )
+        file.write( "]}\n" )
+
+# The writers by name, as chosen on the command line
+WRITERS = { 'text': writeText, 'csv': writeCsv, 'jsonl': writeJsonLines }
+
+def streamText( puzzle, layers, file, chunk=CHUNK ):
+    """
+    This function writes the layers of escape.solveLayers in
+    the format of writeText as they arrive. The lines come in
+    ascending order of moves, and the positions of a line in
+    the order they were reached.
+    :param puzzle: the pond.CompactPuzzle being solved
+    :param layers: the ( moves, cells ) pairs of solveLayers
+    :param file: the file to write to
+    :param chunk: the number of positions per write
+    :return: None
+    """
+    label = Results( puzzle, None ).label
+    name = lambda cell: "'" + label( cell ) + "'"
+    written = False
+    for moves, cells in layers:
+        if moves == 0:
+            if not written and len( cells ) == 0:
+                file.write( "No starting square.\n" )
+                return
+            file.write( "No path: [" )
+        else:
+            file.write( str(moves) + ": [" )
+        writeCells( file, cells, name, chunk )
+        file.write( "]\n" )
+        file.flush()
+        written = True
+
+def streamCsv( puzzle, layers, file, chunk=CHUNK ):
+    """
+    This function writes the layers of escape.solveLayers in
+    the format of writeCsv as they arrive.
+    :param puzzle: the pond.CompactPuzzle being solved
+    :param layers: the ( moves, cells ) pairs of solveLayers
+    :param file: the file to write to
+    :param chunk: the number of positions per write
+    :return: None
+    """
+    width = puzzle.width
+    file.write( "column,row,moves\n" )
+    for moves, cells in layers:
+        text = "," + ( str(moves) if moves != 0 else "" ) + "\n"
+        for start in range( 0, len( cells ), chunk ):
+            file.write( "".join( [ str(cell % width) + "," + str(cell // width) + text
+                                   for cell in cells[start:start + chunk] ] ) )
+        file.flush()
+
+def streamJsonLines( puzzle, layers, file, chunk=CHUNK ):
+    """
+    This function writes the layers of escape.solveLayers in
+    the format of writeJsonLines as they arrive, leaving out
+    an empty list of positions with no path.
+    :param puzzle: the pond.CompactPuzzle being solved
+    :param layers: the ( moves, cells ) pairs of solveLayers
+    :param file: the file to write to
+    :param chunk: the number of positions per write
+    :return: None
+    """
+    label = Results( puzzle, None ).label
+    name = lambda cell: '"' + label( cell ) + '"'
+    for moves, cells in layers:
+        if len( cells ) == 0:
+            continue
+        file.write( '{"moves": ' + str(moves) + ', "positions": [' )
+        writeCells( file, cells, name, chunk )
+        file.write( "]}\n" )
+        file.flush()
+
+# The streaming writers by name, as chosen on the command line
+STREAMERS = { 'text': streamText, 'csv': streamCsv, 'jsonl': streamJsonLines }
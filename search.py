@@ -0,0 +1,183 @@
+"""
+This module answers a single "how do I get out from here"
+query without exploring the whole pond, as escape.findDJI does.
+It offers three goal directed searches:
+
+    'early'          Dijkstra's algorithm that stops as soon as
+                     the exit is popped
+    'astar'          A* search, guided by a lower bound on the
+                     number of moves left ( see estimate )
+    'bidirectional'  breadth first searches forwards from the
+                     start and backwards from the exit, over
+                     reversed slides, that meet in the middle
+
+and 'full', which explores everything like findDJI, for
+comparison. Every search counts the positions it expands.
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import escape
+import heap
+
+# The searches findPath knows
+MODES = ( 'full', 'early', 'astar', 'bidirectional' )
+
+def estimate( position, endVert, tables ):
+    """
+    This function is the heuristic of the A* search. It never
+    overestimates the number of moves left: only the exit needs
+    none, only a position with a clear slide right into the exit
+    needs one, and any other position needs at least two. It is
+    also consistent, so a position never has to be expanded twice.
+    :param position: the position to estimate from
+    :param endVert: the escape node
+    :param tables: the SlideTables of the puzzle
+    :return: A lower bound on the number of moves to the exit
+    """
+    if position is endVert:
+        return 0
+    if tables.slide( position, 'right' ) is endVert:
+        return 1
+    return 2
+
+def findPath( puzzle, startVert, endVert, tables, mode='early' ):
+    """
+    This function finds a shortest path from a position to
+    the exit.
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param startVert: the source node object
+    :param endVert: the escape node, None if the exit is blocked
+    :param tables: the SlideTables of the puzzle
+    :param mode: one of MODES
+    :return: A list of node objects corresponding to the shortest
+             path, or None if there is no path, and the number of
+             positions expanded
+    """
+    if endVert == None and mode != 'full':
+        return None, 0
+    if mode == 'bidirectional':
+        return meetInMiddle( puzzle, startVert, endVert, tables )
+    if mode not in MODES:
+        raise ValueError( "Unknown mode: " + str(mode) )
+
+    if mode == 'astar':
+        guess = lambda position: estimate( position, endVert, tables )
+    else:
+        guess = lambda position: 0
+
+    dist = { startVert: 0 }
+    prev = { startVert: None }
+    settled = set()
+    q = heap.BucketQueue()
+    q.insert( startVert, guess( startVert ) )
+    expanded = 0
+
+    while (q):
+        current = q.pop()
+        settled.add( current )
+        expanded += 1
+        if current is endVert and mode != 'full':
+            break
+
+        moves = dist[current] + 1
+        for direction in escape.DIRECTIONS:
+            n = tables.slide( current, direction )
+            if n not in dist:
+                dist[n] = moves
+                prev[n] = current
+                q.insert( n, moves + guess( n ) )
+            elif moves < dist[n] and n not in settled:
+                dist[n] = moves
+                prev[n] = current
+                q.decreaseKey( n, moves + guess( n ) )
+
+    if endVert in dist:
+        return escape.backtrack( startVert, endVert, prev ), expanded
+    return None, expanded
+
+def meetInMiddle( puzzle, startVert, endVert, tables ):
+    """
+    This function is the bidirectional search of findPath. It
+    grows whichever side has the smaller frontier by one whole
+    layer at a time. Once a layer reaches a position the other
+    side has seen, the best meeting point found in that layer
+    lies on a shortest path.
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param startVert: the source node object
+    :param endVert: the escape node
+    :param tables: the SlideTables of the puzzle
+    :return: A list of node objects corresponding to the shortest
+             path, or None if there is no path, and the number of
+             positions expanded
+    """
+    if startVert is endVert:
+        return [ startVert ], 0
+
+    # Moves from the start, and moves to the exit, of every
+    # position seen by each side, and the links back
+    forward = { startVert: 0 }
+    backward = { endVert: 0 }
+    prev = { startVert: None }
+    next = { endVert: None }
+    forwardLayer = [ startVert ]
+    backwardLayer = [ endVert ]
+    expanded = 0
+    meet = None
+    best = None
+
+    while forwardLayer and backwardLayer and meet == None:
+        layer = []
+        if len( forwardLayer ) <= len( backwardLayer ):
+            for current in forwardLayer:
+                expanded += 1
+                for direction in escape.DIRECTIONS:
+                    n = tables.slide( current, direction )
+                    if n not in forward:
+                        forward[n] = forward[current] + 1
+                        prev[n] = current
+                        layer.append( n )
+                        if n in backward and ( best == None or forward[n] + backward[n] < best ):
+                            best = forward[n] + backward[n]
+                            meet = n
+            forwardLayer = layer
+        else:
+            for current in backwardLayer:
+                expanded += 1
+                for direction in escape.DIRECTIONS:
+                    for n in escape.slidesInto( puzzle, current, direction ):
+                        if n not in backward:
+                            backward[n] = backward[current] + 1
+                            next[n] = current
+                            layer.append( n )
+                            if n in forward and ( best == None or forward[n] + backward[n] < best ):
+                                best = forward[n] + backward[n]
+                                meet = n
+            backwardLayer = layer
+
+    if meet == None:
+        return None, expanded
+
+    path = escape.backtrack( startVert, meet, prev )
+    current = next[meet]
+    while current != None:
+        path.append( current )
+        current = next[current]
+    return path, expanded
+
+def compareModes( puzzle, startVert, endVert, tables ):
+    """
+    This function runs every search from one position.
+    :param puzzle: the 2d array of nodes that represents the puzzle
+    :param startVert: the source node object
+    :param endVert: the escape node
+    :param tables: the SlideTables of the puzzle
+    :return: A dictionary from modes to the number of moves found
+             ( None if there is no path ) and the number of
+             positions expanded
+    """
+    counts = {}
+    for mode in MODES:
+        path, expanded = findPath( puzzle, startVert, endVert, tables, mode )
+        counts[mode] = ( None if path == None else len(path)-1, expanded )
+    return counts
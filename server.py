@@ -0,0 +1,215 @@
+"""
+This module is a long running query service for frozen pond
+puzzles. Ponds are solved once, in a worker process, and their
+shortest path trees are kept in memory to answer queries.
+
+Clients talk to it over TCP or a Unix socket, one JSON object
+per line in each direction. The requests are
+
+    {"op": "load", "pond": NAME, "file": FILE}
+    {"op": "distance", "pond": NAME, "column": C, "row": R}
+    {"op": "path", "pond": NAME, "column": C, "row": R}
+    {"op": "ponds"}
+
+and any "id" in a request is copied into its response. Every
+response has "ok", and either the answer or an "error". Moves
+are null when there is no path, and paths are lists of
+[column, row] pairs ending at the exit.
+
+Queries that arrive during the same tick of the event loop are
+answered together in one batch. It is started through escape.py:
+
+    python escape.py --serve test1 test2 --port 8765
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import escape
+import pond
+
+def solvePond( fileName ):
+    """
+    This function reads and solves a pond in a worker process.
+    :param fileName: the puzzle file
+    :return: The PathTree of the pond
+    """
+    return escape.solveCompact( pond.readCompact( fileName ) )
+
+class PondServer(object):
+    """
+    This class holds the solved ponds and answers queries.
+    """
+
+    __slots__ = 'trees', 'executor', 'pending', 'batches'
+
+    def __init__( self, workers=None ):
+        """
+        The initialization method.
+        :param workers: the number of processes that solve ponds,
+                        or None for one per processor
+        :return: None
+        """
+        self.trees = {}
+        self.executor = ProcessPoolExecutor( max_workers=workers )
+        self.pending = []
+        self.batches = 0
+
+    async def load( self, name, fileName ):
+        """
+        This method solves a pond without blocking the queries.
+        :param name: the name to answer queries about it under
+        :param fileName: the puzzle file
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        self.trees[name] = await loop.run_in_executor( self.executor, solvePond, fileName )
+
+    def answer( self, request ):
+        """
+        This method answers a distance, path or ponds query
+        from the trees in memory.
+        :param request: the decoded request
+        :return: The response, without its id
+        """
+        op = request.get( 'op' )
+        if op == 'ponds':
+            return { 'ok': True, 'ponds': sorted( self.trees ) }
+        if op not in ( 'distance', 'path' ):
+            return { 'ok': False, 'error': "unknown op " + repr( op ) }
+
+        name = request.get( 'pond' )
+        tree = self.trees.get( name ) if type( name ) == str else None
+        if tree == None:
+            return { 'ok': False, 'error': "unknown pond " + repr( request.get( 'pond' ) ) }
+        puzzle = tree.puzzle
+        row = request.get( 'row' )
+        column = request.get( 'column' )
+        # JSON true and false arrive as bool, which is an int
+        if type( row ) != int or type( column ) != int or \
+                not 0 <= row < puzzle.height or not 0 <= column < puzzle.width:
+            return { 'ok': False, 'error': "no position at column " + repr( column ) +
+                                           ", row " + repr( row ) }
+        cell = puzzle.cell( row, column )
+        if puzzle.rocks[cell]:
+            return { 'ok': False, 'error': "position is a rock" }
+
+        moves = tree.distance( cell )
+        response = { 'ok': True, 'moves': moves if moves != -1 else None }
+        if op == 'path':
+            response['path'] = [ list( reversed( puzzle.position( step ) ) )
+                                 for step in tree.path( cell ) ]
+        return response
+
+    def flush( self ):
+        """
+        This method answers every query that arrived in this
+        tick of the event loop.
+        :return: None
+        """
+        batch = self.pending
+        self.pending = []
+        self.batches += 1
+        for request, future in batch:
+            if future.cancelled():
+                continue
+
+            # A request that breaks answer only fails itself,
+            # not the rest of the batch
+            try:
+                response = self.answer( request )
+            except Exception as error:
+                response = { 'ok': False, 'error': type( error ).__name__ + ": " + str( error ) }
+            future.set_result( response )
+
+    def query( self, request ):
+        """
+        This method queues a query for the next batch.
+        :param request: the decoded request
+        :return: A future of the response
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self.pending:
+            loop.call_soon( self.flush )
+        self.pending.append( ( request, future ) )
+        return future
+
+    async def handle( self, request ):
+        """
+        This method answers one request.
+        :param request: the decoded request
+        :return: The response
+        """
+        if request.get( 'op' ) == 'load':
+            try:
+                await self.load( request['pond'], request['file'] )
+            except Exception as error:
+                return { 'ok': False, 'error': type( error ).__name__ + ": " + str( error ) }
+            return { 'ok': True, 'pond': request['pond'] }
+        return await self.query( request )
+
+    async def serveClient( self, reader, writer ):
+        """
+        This method talks to one client until it disconnects.
+        :param reader: the stream of requests
+        :param writer: the stream of responses
+        :return: None
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads( line )
+                    if not isinstance( request, dict ):
+                        raise ValueError( "request is not an object" )
+                except ValueError as error:
+                    response = { 'ok': False, 'error': "bad request: " + str( error ) }
+                else:
+                    response = await self.handle( request )
+                    if 'id' in request:
+                        response['id'] = request['id']
+                writer.write( json.dumps( response ).encode() + b'\n' )
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def run( self, ponds=(), host='127.0.0.1', port=8765, path=None ):
+        """
+        This method loads the given ponds and serves until cancelled.
+        :param ponds: puzzle files to load first, named by file name
+        :param host: the address to listen on
+        :param port: the TCP port to listen on
+        :param path: a Unix socket to listen on instead of TCP
+        :return: None
+        """
+        await asyncio.gather( *[ self.load( fileName, fileName ) for fileName in ponds ] )
+        if path != None:
+            server = await asyncio.start_unix_server( self.serveClient, path )
+        else:
+            server = await asyncio.start_server( self.serveClient, host, port )
+        async with server:
+            await server.serve_forever()
+
+def serve( ponds=(), host='127.0.0.1', port=8765, path=None, workers=None ):
+    """
+    This function runs a PondServer until interrupted.
+    :param ponds: puzzle files to load first
+    :param host: the address to listen on
+    :param port: the TCP port to listen on
+    :param path: a Unix socket to listen on instead of TCP
+    :param workers: the number of processes that solve ponds
+    :return: None
+    """
+    server = PondServer( workers )
+    try:
+        asyncio.run( server.run( ponds, host, port, path ) )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown()
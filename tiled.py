@@ -0,0 +1,462 @@
+"""
+This module solves frozen pond puzzles too large to hold in
+memory, by keeping the pond on disk in square tiles and only
+loading one tile at a time.
+
+Splitting reads the puzzle file one row at a time and writes
+every tile with a ring of the rocks around it, its halo, so
+that whether a slide stops at the border of a tile can be told
+from the tile alone. Positions just off the pond are stored as
+rocks in the halo.
+
+The solve is the reverse search of escape.solveCompact, done
+one layer of moves at a time. For every position reached with
+d moves, each direction it is a slide stop for starts a walk
+backwards along its row or column, and every position on the
+walk not yet reached gets d + 1 moves. A walk that reaches the
+halo of its tile cannot go on there, so it is handed to the
+next tile as a message, and the tiles with messages are worked
+through again until none are left. The positions reached, the
+next layer, are appended to a file per tile, so the only things
+in memory are one tile, its distances, and the layer and
+messages of that tile.
+
+The moves from every position are kept in a file of 32 bit
+integers per tile, -1 where there is no path, and can be
+written out per tile as CSV.
+
+    python tiled.py pond.txt tiles/ --memory 64
+"""
+
+__author__ = 'Amit Maller', 'Kyle McGlynn'
+
+import argparse
+import json
+import mmap
+import os
+import sys
+from array import array
+
+import pond
+
+# The directions in the order of escape.DIRECTIONS
+DIRECTIONS = ( 'left', 'up', 'right', 'down' )
+
+# The bytes needed per position of a loaded tile: a rock flag,
+# the distance, and at most a layer entry and a message each
+BYTES_PER_CELL = 13
+
+class TiledPond(object):
+    """
+    This class describes a pond split into tiles on disk.
+    Tiles are numbered by their row and column of tiles.
+    """
+
+    __slots__ = 'directory', 'height', 'width', 'escape', 'exits', 'tileSize', \
+                'tileRows', 'tileColumns'
+
+    def __init__( self, directory, height, width, escape, exits, tileSize ):
+        """
+        The initialization method.
+        :param directory: where the tiles are kept
+        :param height: the height of the pond
+        :param width: the width of the pond
+        :param escape: the row where the exit is located
+        :param exits: every exit, as in pond.CompactPuzzle.exits
+        :param tileSize: the height and width of a tile
+        :return: None
+        """
+        self.directory = directory
+        self.height = height
+        self.width = width
+        self.escape = escape
+        self.exits = tuple( tuple( exit ) for exit in exits )
+        self.tileSize = tileSize
+        self.tileRows = -( -height // tileSize )
+        self.tileColumns = -( -width // tileSize )
+
+    def save( self ):
+        """
+        This method writes the description of the pond next
+        to its tiles.
+        :return: None
+        """
+        with open( os.path.join( self.directory, 'pond.json' ), 'w' ) as file:
+            json.dump( { 'height': self.height, 'width': self.width,
+                         'escape': self.escape, 'exits': self.exits,
+                         'tileSize': self.tileSize }, file )
+
+    def tiles( self ):
+        """
+        :return: A list of every tile, as ( tile row, tile column )
+        """
+        return [ ( tileRow, tileColumn ) for tileRow in range( self.tileRows )
+                 for tileColumn in range( self.tileColumns ) ]
+
+    def bounds( self, tile ):
+        """
+        This method finds where a tile lies in the pond.
+        :param tile: the tile, as ( tile row, tile column )
+        :return: The top row, left column, height and width of the tile
+        """
+        top = tile[0] * self.tileSize
+        left = tile[1] * self.tileSize
+        return top, left, min( self.tileSize, self.height - top ), \
+            min( self.tileSize, self.width - left )
+
+    def fileName( self, kind, tile ):
+        """
+        :param kind: 'rocks', 'dist', 'layer', 'next' or 'messages'
+        :param tile: the tile, as ( tile row, tile column )
+        :return: The name of the file of that kind for the tile
+        """
+        return os.path.join( self.directory, "%s-%d-%d" % ( kind, tile[0], tile[1] ) )
+
+    def readRocks( self, tile ):
+        """
+        :param tile: the tile, as ( tile row, tile column )
+        :return: The rock flags of the tile and its halo, row by row
+        """
+        with open( self.fileName( 'rocks', tile ), 'rb' ) as file:
+            return bytearray( file.read() )
+
+    def readDistances( self, tile ):
+        """
+        :param tile: the tile, as ( tile row, tile column )
+        :return: The moves from every position of the tile, row
+                 by row, -1 for rocks and positions with no path
+        """
+        top, left, height, width = self.bounds( tile )
+        dist = array( 'i' )
+        with open( self.fileName( 'dist', tile ), 'rb' ) as file:
+            dist.fromfile( file, height * width )
+        return dist
+
+    def writeDistances( self, tile, dist ):
+        """
+        :param tile: the tile, as ( tile row, tile column )
+        :param dist: the moves from every position of the tile
+        :return: None
+        """
+        with open( self.fileName( 'dist', tile ), 'wb' ) as file:
+            dist.tofile( file )
+
+def tileSizeFor( memory ):
+    """
+    This function picks the largest tiles that fit in memory.
+    :param memory: the memory budget in bytes
+    :return: The height and width of a tile
+    """
+    size = 8
+    while ( size * 2 + 2 ) ** 2 * BYTES_PER_CELL <= memory:
+        size *= 2
+    return size
+
+def openTiles( directory ):
+    """
+    This function opens a pond split by splitPond.
+    :param directory: where the tiles are kept
+    :return: A TiledPond
+    """
+    with open( os.path.join( directory, 'pond.json' ) ) as file:
+        description = json.load( file )
+    return TiledPond( directory, description['height'], description['width'],
+                      description['escape'], description['exits'],
+                      description['tileSize'] )
+
+def splitPond( fileName, directory, tileSize ):
+    """
+    This function splits a puzzle file into tiles. The file
+    is memory mapped and read one row at a time; only the rows
+    of two bands of tiles are ever open at once.
+    :param fileName: The name of the puzzle file
+    :param directory: where to keep the tiles
+    :param tileSize: the height and width of a tile
+    :return: A TiledPond
+    """
+    os.makedirs( directory, exist_ok=True )
+    with open( fileName, 'rb' ) as file:
+        height, width, escape, exits = pond.readHeader( file.readline() )
+        tiled = TiledPond( directory, height, width, escape,
+                           ( ( 'right', escape ), ) + exits, tileSize )
+        if height == 0 or width == 0:
+            tiled.tileRows = tiled.tileColumns = 0
+            tiled.save()
+            return tiled
+        start = file.tell()
+        with mmap.mmap( file.fileno(), 0, access=mmap.ACCESS_READ ) as data:
+            splitRows( tiled, pond.rockRows( data, start, height, width ) )
+
+    # Nothing has been reached yet
+    for tile in tiled.tiles():
+        top, left, tileHeight, tileWidth = tiled.bounds( tile )
+        tiled.writeDistances( tile, array( 'i', [-1] ) * ( tileHeight * tileWidth ) )
+    tiled.save()
+    return tiled
+
+def splitRows( tiled, rows ):
+    """
+    This function writes the rows of a pond to its tiles. Every
+    row goes to its own band of tiles, and to the halo of the
+    band above or below if it is at the edge of its band.
+    :param tiled: the TiledPond
+    :param rows: a generator of the rows of rock flags
+    :return: None
+    """
+    size = tiled.tileSize
+    rock = b'\x01'
+    edge = rock * ( tiled.width + 2 )
+    bands = {}
+
+    def openBand( band ):
+        bands[band] = [ open( tiled.fileName( 'rocks', ( band, tileColumn ) ), 'wb' )
+                        for tileColumn in range( tiled.tileColumns ) ]
+
+    def writeRow( band, padded ):
+        for tileColumn, file in enumerate( bands[band] ):
+            left = tileColumn * size
+            file.write( padded[left:left + min( size, tiled.width - left ) + 2] )
+
+    openBand( 0 )
+    writeRow( 0, edge )
+    for row, line in enumerate( rows ):
+        padded = rock + line + rock
+        band = row // size
+        writeRow( band, padded )
+
+        # The first row of a band is the bottom halo of the one above
+        if row % size == 0 and band > 0:
+            writeRow( band - 1, padded )
+            for file in bands.pop( band - 1 ):
+                file.close()
+
+        # The last row of a band is the top halo of the one below
+        if row % size == size - 1 and row + 1 < tiled.height:
+            openBand( band + 1 )
+            writeRow( band + 1, padded )
+
+    last = ( tiled.height - 1 ) // size
+    writeRow( last, edge )
+    for file in bands.pop( last ):
+        file.close()
+
+def appendCells( tiled, kind, tile, cells ):
+    """
+    This function appends integers to a file of a tile.
+    :param tiled: the TiledPond
+    :param kind: the kind of file, see TiledPond.fileName
+    :param tile: the tile, as ( tile row, tile column )
+    :param cells: an array of integers
+    :return: None
+    """
+    with open( tiled.fileName( kind, tile ), 'ab' ) as file:
+        cells.tofile( file )
+
+def takeCells( tiled, kind, tile ):
+    """
+    This function reads and removes a file of a tile.
+    :param tiled: the TiledPond
+    :param kind: the kind of file, see TiledPond.fileName
+    :param tile: the tile, as ( tile row, tile column )
+    :return: An array of the integers in the file, empty if
+             there is no file
+    """
+    cells = array( 'i' )
+    name = tiled.fileName( kind, tile )
+    if os.path.exists( name ):
+        with open( name, 'rb' ) as file:
+            cells.frombytes( file.read() )
+        os.remove( name )
+    return cells
+
+def expandTile( tiled, tile, layer, messages, moves, outbox ):
+    """
+    This function does the work of one layer in one tile: it
+    starts a walk from every slide stop of the layer, follows
+    the walks handed over by other tiles, and gives every
+    position they pass that has not been reached the given
+    number of moves.
+    :param tiled: the TiledPond
+    :param tile: the tile, as ( tile row, tile column )
+    :param layer: the positions of the tile reached with one
+                  move fewer, as indexes into its distances
+    :param messages: walks handed over by other tiles, as pairs
+                     of a direction index and a position of the pond
+    :param moves: the number of moves of the positions reached
+    :param outbox: a dictionary from tiles to the messages for
+                   them, added to by this function
+    :return: The positions reached, as indexes into the distances
+    """
+    top, left, height, width = tiled.bounds( tile )
+    rocks = tiled.readRocks( tile )
+    dist = tiled.readDistances( tile )
+    span = width + 2
+
+    # The step backwards along a slide in each direction
+    steps = ( 1, span, -1, -span )
+
+    # The exits, by direction and the row or column they are next to
+    exits = set( ( DIRECTIONS.index( side ), index ) for side, index in tiled.exits )
+
+    def stops( padded, direction ):
+        n = padded - steps[direction]
+        if not rocks[n]:
+            return False
+        row = top + n // span - 1
+        column = left + n % span - 1
+        if 0 <= row < tiled.height and 0 <= column < tiled.width:
+            return True
+        lane = row if direction in ( 0, 2 ) else column
+        return ( direction, lane ) not in exits
+
+    walks = []
+    for local in layer:
+        row, column = divmod( local, width )
+        padded = ( row + 1 ) * span + column + 1
+        for direction in range( 4 ):
+            if stops( padded, direction ):
+                walks.append( ( direction, padded ) )
+    for message in range( 0, len( messages ), 2 ):
+        row, column = divmod( messages[message + 1], tiled.width )
+        padded = ( row - top + 1 ) * span + column - left + 1
+        if not rocks[padded]:
+            walks.append( ( messages[message], padded ) )
+
+    reached = array( 'i' )
+    for direction, padded in walks:
+        step = steps[direction]
+        while True:
+            row, column = divmod( padded, span )
+            local = ( row - 1 ) * width + column - 1
+            if dist[local] == -1:
+                dist[local] = moves
+                reached.append( local )
+            padded += step
+            if rocks[padded]:
+                break
+            row, column = divmod( padded, span )
+            if row == 0 or row == height + 1 or column == 0 or column == width + 1:
+                cell = ( top + row - 1 ) * tiled.width + left + column - 1
+                other = ( ( top + row - 1 ) // tiled.tileSize,
+                          ( left + column - 1 ) // tiled.tileSize )
+                outbox.setdefault( other, array( 'i' ) ).extend( ( direction, cell ) )
+                break
+
+    tiled.writeDistances( tile, dist )
+    return reached
+
+def solveTiled( tiled ):
+    """
+    This function solves a tiled pond, one layer of moves at a
+    time and one tile at a time. The moves from every position
+    are left in the distance file of its tile.
+    :param tiled: a TiledPond, as returned by splitPond
+    :return: The largest number of moves needed from any position
+    """
+
+    # The walks from every exit start at the position next to it
+    messageTiles = set()
+    for side, index in tiled.exits:
+        direction = DIRECTIONS.index( side )
+        if tiled.height == 0 or tiled.width == 0:
+            continue
+        row, column = { 'right': ( index, tiled.width - 1 ), 'left': ( index, 0 ),
+                        'up': ( 0, index ), 'down': ( tiled.height - 1, index ) }[side]
+        tile = ( row // tiled.tileSize, column // tiled.tileSize )
+        appendCells( tiled, 'messages', tile, array( 'i', ( direction, row * tiled.width + column ) ) )
+        messageTiles.add( tile )
+
+    layerTiles = set()
+    moves = 0
+    while layerTiles or messageTiles:
+        moves += 1
+        nextTiles = set()
+        work = layerTiles | messageTiles
+        while work:
+            messageTiles = set()
+            for tile in sorted( work ):
+                layer = takeCells( tiled, 'layer', tile ) if tile in layerTiles else array( 'i' )
+                outbox = {}
+                reached = expandTile( tiled, tile, layer, takeCells( tiled, 'messages', tile ),
+                                      moves, outbox )
+                if len( reached ) > 0:
+                    appendCells( tiled, 'next', tile, reached )
+                    nextTiles.add( tile )
+                for other, messages in outbox.items():
+                    appendCells( tiled, 'messages', other, messages )
+                    messageTiles.add( other )
+            layerTiles = set()
+            work = messageTiles
+
+        for tile in nextTiles:
+            os.replace( tiled.fileName( 'next', tile ), tiled.fileName( 'layer', tile ) )
+        layerTiles = nextTiles
+
+    return moves - 1 if moves > 0 else 0
+
+def writeResults( tiled ):
+    """
+    This function writes the moves of every tile as CSV, in
+    the format of results.writeCsv, to a file per tile.
+    :param tiled: a solved TiledPond
+    :return: A list of the names of the files written
+    """
+    names = []
+    for tile in tiled.tiles():
+        top, left, height, width = tiled.bounds( tile )
+        rocks = tiled.readRocks( tile )
+        dist = tiled.readDistances( tile )
+        names.append( tiled.fileName( 'moves', tile ) + '.csv' )
+        with open( names[-1], 'w' ) as file:
+            file.write( "column,row,moves\n" )
+            for column in range( width ):
+                lines = []
+                for row in range( height ):
+                    if rocks[( row + 1 ) * ( width + 2 ) + column + 1]:
+                        continue
+                    moves = dist[row * width + column]
+                    lines.append( str(left + column) + "," + str(top + row) + "," +
+                                  ( str(moves) if moves >= 0 else "" ) + "\n" )
+                file.write( "".join( lines ) )
+    return names
+
+def gather( tiled ):
+    """
+    This function puts the moves of all the tiles together,
+    for ponds that do fit in memory.
+    :param tiled: a solved TiledPond
+    :return: An array of the moves from every cell id, -1 if none
+    """
+    dist = array( 'l', [-1] ) * ( tiled.height * tiled.width )
+    for tile in tiled.tiles():
+        top, left, height, width = tiled.bounds( tile )
+        moves = tiled.readDistances( tile )
+        for row in range( height ):
+            base = ( top + row ) * tiled.width + left
+            dist[base:base + width] = array( 'l', moves[row * width:( row + 1 ) * width] )
+    return dist
+
+def main( arguments=None ):
+    """
+    This function splits a puzzle file into tiles, solves it,
+    and writes the results of every tile.
+    :param arguments: the command line arguments, or None for sys.argv
+    :return: None
+    """
+    parser = argparse.ArgumentParser( description="Solve a pond larger than memory." )
+    parser.add_argument( 'puzzle' )
+    parser.add_argument( 'directory', help="where to keep the tiles and results" )
+    parser.add_argument( '--memory', type=float, default=64,
+                         help="the memory budget of a tile, in megabytes" )
+    options = parser.parse_args( arguments )
+
+    tiled = splitPond( options.puzzle, options.directory,
+                       tileSizeFor( int( options.memory * 2 ** 20 ) ) )
+    deepest = solveTiled( tiled )
+    names = writeResults( tiled )
+    print( "%d x %d pond in %d tiles of %d x %d, at most %d moves, results in %s" %
+           ( tiled.height, tiled.width, len( names ), tiled.tileSize, tiled.tileSize,
+             deepest, options.directory ), file=sys.stderr )
+
+if __name__ == '__main__':
+    main()